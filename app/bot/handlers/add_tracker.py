@@ -1,6 +1,5 @@
 from __future__ import annotations
 import re
-import aiohttp
 from aiogram import Router, F
 from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery
@@ -9,59 +8,20 @@ from app.bot.states import AddTracker
 from app.bot.keyboards.common import choose_kind_kb, choose_direction_kb, back_to_menu_kb
 from app.bot.keyboards.coins import coins_kb
 from app.db.models import Tracker, TrackerKind, Direction
+from app.db.pairs import acquire_pair
 from app.db.session import SessionLocal
-from app.services.prices.coingecko import CoinGeckoClient
-from app.services.prices.frankfurter import FrankfurterClient
+from app.services.prices.cache import PriceCache
+from app.services.prices.catalog import CoinCatalog
+from app.services.prices.quotes import crypto_price, fx_rate
+from app.services.prices.registry import PriceRouter
 
-router = Router()
+router = Router(name="add_tracker")
 
 
 def _is_ccy(s: str) -> bool:
     return bool(re.fullmatch(r"[A-Za-z]{3}", s.strip()))
 
 
-async def _nbu_to_uah(http: aiohttp.ClientSession, ccy: str) -> float:
-    ccy = ccy.upper()
-    if ccy == "UAH":
-        return 1.0
-    url = f"https://bank.gov.ua/NBUStatService/v1/statdirectory/exchange?valcode={ccy}&json"
-    async with http.get(url, timeout=15) as r:
-        r.raise_for_status()
-        data = await r.json()
-    if not data:
-        raise ValueError(f"NBU: unknown currency {ccy}")
-    return float(data[0]["rate"])
-
-
-async def _fx_rate(base: str, quote: str) -> float:
-    """
-    Returns base/quote exchange rate.
-    If UAH is involved — fallback to NBU (Frankfurter often doesn't support UAH).
-    """
-    base = base.upper()
-    quote = quote.upper()
-
-    if base == quote:
-        return 1.0
-
-    async with aiohttp.ClientSession(headers={"User-Agent": "price-tracker-bot/1.0"}) as http:
-
-        if base == "UAH" or quote == "UAH":
-            if quote == "UAH":
-                return await _nbu_to_uah(http, base)
-
-            q_to_uah = await _nbu_to_uah(http, quote)
-            return 1.0 / q_to_uah
-
-
-        ff = FrankfurterClient(http)
-        rates = await ff.latest(base, [quote])
-        rate = rates.get(quote)
-        if rate is None:
-            raise ValueError("No rate returned")
-        return float(rate)
-
-
 @router.message(Command("add"))
 async def cmd_add(message: Message, state: FSMContext):
     await state.clear()
@@ -90,11 +50,9 @@ async def cb_kind(call: CallbackQuery, state: FSMContext):
 
 
 @router.message(AddTracker.crypto_query)
-async def crypto_query(message: Message, state: FSMContext):
+async def crypto_query(message: Message, state: FSMContext, coin_catalog: CoinCatalog):
     q = message.text.strip()
-    async with aiohttp.ClientSession(headers={"User-Agent": "price-tracker-bot/1.0"}) as http:
-        cg = CoinGeckoClient(http)
-        coins = await cg.search(q, limit=5)
+    coins = await coin_catalog.search(q, limit=5)
 
     if not coins:
         await message.answer("Nothing found 😿 Try another query:", reply_markup=back_to_menu_kb())
@@ -125,7 +83,7 @@ async def coin_choose(call: CallbackQuery, state: FSMContext):
 
 
 @router.message(AddTracker.quote)
-async def set_quote(message: Message, state: FSMContext):
+async def set_quote(message: Message, state: FSMContext, price_router: PriceRouter, price_cache: PriceCache):
     quote = message.text.strip().upper()
     if not _is_ccy(quote):
         await message.answer("Quote currency must be 3 letters, e.g. `USD` or `UAH`.", parse_mode="Markdown")
@@ -138,11 +96,7 @@ async def set_quote(message: Message, state: FSMContext):
     await state.update_data(quote=quote)
 
     try:
-        async with aiohttp.ClientSession(headers={"User-Agent": "price-tracker-bot/1.0"}) as http:
-            cg = CoinGeckoClient(http)
-            prices = await cg.simple_price([coin_id], [quote.lower()])
-
-        price = (prices.get(coin_id) or {}).get(quote.lower())
+        price = await crypto_price(price_router, price_cache, coin_id, quote)
         if price is None:
             await message.answer(
                 "Couldn't fetch the current price 😿 Try another currency (USD/UAH/EUR).",
@@ -179,7 +133,9 @@ async def fx_base(message: Message, state: FSMContext):
 
 
 @router.message(AddTracker.fx_quote)
-async def fx_quote(message: Message, state: FSMContext):
+async def fx_quote(
+    message: Message, state: FSMContext, price_router: PriceRouter, price_cache: PriceCache
+):
     quote = message.text.strip().upper()
     if not _is_ccy(quote):
         await message.answer("Quote currency must be 3 letters, e.g. `UAH`.", parse_mode="Markdown")
@@ -190,7 +146,9 @@ async def fx_quote(message: Message, state: FSMContext):
     await state.update_data(quote=quote)
 
     try:
-        current_rate = await _fx_rate(base, quote)
+        current_rate = await fx_rate(price_router, price_cache, base, quote)
+        if current_rate is None:
+            raise ValueError("No rate returned")
     except Exception:
         await message.answer(
             "Couldn't fetch the current exchange rate 😿 Check currency codes or try later.",
@@ -241,12 +199,14 @@ async def set_target(message: Message, state: FSMContext):
     coin_id = str(data["coin_id"]) if kind == TrackerKind.crypto else None
 
     async with SessionLocal() as session:
+        pair_id = await acquire_pair(session, kind, coin_id, base, quote)
         trk = Tracker(
             tg_user_id=message.from_user.id,
             kind=kind,
             coin_id=coin_id,
             base=base,
             quote=quote,
+            pair_id=pair_id,
             direction=direction,
             target=target,
             is_active=True,
@@ -6,9 +6,10 @@ from sqlalchemy import select, delete, update
 from app.bot.keyboards.trackers import trackers_manage_kb
 from app.bot.keyboards.common import back_to_menu_kb, main_menu_kb
 from app.db.models import Tracker
+from app.db.pairs import adjust_pair
 from app.db.session import SessionLocal
 
-router = Router()
+router = Router(name="list_trackers")
 
 
 def _render(trackers: list[Tracker]) -> str:
@@ -54,13 +55,16 @@ async def cb_toggle(call: CallbackQuery):
     trk_id = int(call.data.split(":")[-1])
     async with SessionLocal() as session:
         res = await session.execute(
-            select(Tracker).where(Tracker.id == trk_id, Tracker.tg_user_id == call.from_user.id)
+            select(Tracker)
+            .where(Tracker.id == trk_id, Tracker.tg_user_id == call.from_user.id)
+            .with_for_update()
         )
         trk = res.scalar_one_or_none()
         if trk is None:
             await call.answer("Not found", show_alert=True)
             return
         trk.is_active = not trk.is_active
+        await adjust_pair(session, trk.pair_id, 1 if trk.is_active else -1)
         await session.commit()
 
         res2 = await session.execute(
@@ -78,9 +82,14 @@ async def cb_toggle(call: CallbackQuery):
 async def cb_delete(call: CallbackQuery):
     trk_id = int(call.data.split(":")[-1])
     async with SessionLocal() as session:
-        await session.execute(
-            delete(Tracker).where(Tracker.id == trk_id, Tracker.tg_user_id == call.from_user.id)
+        res = await session.execute(
+            delete(Tracker)
+            .where(Tracker.id == trk_id, Tracker.tg_user_id == call.from_user.id)
+            .returning(Tracker.pair_id, Tracker.is_active)
         )
+        deleted = res.first()
+        if deleted is not None and deleted.is_active:
+            await adjust_pair(session, deleted.pair_id, -1)
         await session.commit()
         res2 = await session.execute(
             select(Tracker)
@@ -1,6 +1,5 @@
 from __future__ import annotations
 import re
-import aiohttp
 from aiogram import Router, F
 from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery
@@ -8,10 +7,12 @@ from aiogram.fsm.context import FSMContext
 from app.bot.states import Rate
 from app.bot.keyboards.common import choose_kind_kb, back_to_menu_kb
 from app.bot.keyboards.coins import coins_kb
-from app.services.prices.coingecko import CoinGeckoClient
-from app.services.prices.frankfurter import FrankfurterClient
+from app.services.prices.cache import PriceCache
+from app.services.prices.catalog import CoinCatalog
+from app.services.prices.quotes import crypto_price, fx_rate
+from app.services.prices.registry import PriceRouter
 
-router = Router()
+router = Router(name="rate")
 
 
 def _is_ccy(s: str) -> bool:
@@ -56,12 +57,10 @@ async def rate_kind(call: CallbackQuery, state: FSMContext):
 
 
 @router.message(Rate.crypto_query)
-async def rate_crypto_query(message: Message, state: FSMContext):
+async def rate_crypto_query(message: Message, state: FSMContext, coin_catalog: CoinCatalog):
     query = message.text.strip()
 
-    async with aiohttp.ClientSession(headers={"User-Agent": "price-tracker-bot/1.0"}) as http:
-        cg = CoinGeckoClient(http)
-        coins = await cg.search(query, limit=5)
+    coins = await coin_catalog.search(query, limit=5)
 
     if not coins:
         await message.answer(
@@ -97,7 +96,9 @@ async def rate_coin_choose(call: CallbackQuery, state: FSMContext):
 
 
 @router.message(Rate.quote)
-async def rate_crypto_quote(message: Message, state: FSMContext):
+async def rate_crypto_quote(
+    message: Message, state: FSMContext, price_router: PriceRouter, price_cache: PriceCache
+):
     quote = message.text.strip().upper()
 
     if not _is_ccy(quote):
@@ -108,11 +109,7 @@ async def rate_crypto_quote(message: Message, state: FSMContext):
     coin_id = data["coin_id"]
     base = data["base"]
 
-    async with aiohttp.ClientSession(headers={"User-Agent": "price-tracker-bot/1.0"}) as http:
-        cg = CoinGeckoClient(http)
-        prices = await cg.simple_price([coin_id], [quote.lower()])
-
-    price = (prices.get(coin_id) or {}).get(quote.lower())
+    price = await crypto_price(price_router, price_cache, coin_id, quote)
     if price is None:
         await message.answer(
             "Failed to get the price 😿",
@@ -147,7 +144,9 @@ async def rate_fx_base(message: Message, state: FSMContext):
 
 
 @router.message(Rate.fx_quote)
-async def rate_fx_quote(message: Message, state: FSMContext):
+async def rate_fx_quote(
+    message: Message, state: FSMContext, price_router: PriceRouter, price_cache: PriceCache
+):
     quote = message.text.strip().upper()
 
     if not _is_ccy(quote):
@@ -166,11 +165,7 @@ async def rate_fx_quote(message: Message, state: FSMContext):
         await state.clear()
         return
 
-    async with aiohttp.ClientSession(headers={"User-Agent": "price-tracker-bot/1.0"}) as http:
-        ff = FrankfurterClient(http)
-        rates = await ff.latest(base, [quote])
-
-    rate = rates.get(quote)
+    rate = await fx_rate(price_router, price_cache, base, quote)
     if rate is None:
         await message.answer(
             "Failed to get the rate 😿 Check the currency codes.",
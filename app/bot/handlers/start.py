@@ -3,7 +3,7 @@ from aiogram.filters import CommandStart, Command
 from aiogram.types import Message, CallbackQuery
 from app.bot.keyboards.common import main_menu_kb, choose_kind_kb, back_to_menu_kb
 
-router = Router()
+router = Router(name="start")
 
 HELP_TEXT = (
     "I'm a price tracking bot 🧠\n\n"
@@ -1,7 +1,7 @@
 from aiogram import Router
 from app.bot.handlers import start, add_tracker, list_trackers, rate
 
-root_router = Router()
+root_router = Router(name="root")
 root_router.include_router(start.router)
 root_router.include_router(rate.router)
 root_router.include_router(add_tracker.router)
@@ -8,5 +8,77 @@ class Settings(BaseSettings):
     CHECK_INTERVAL_SECONDS: int = 60
     TIMEZONE: str = "Europe/Kyiv"
     LOG_LEVEL: str = "INFO"
+    # bot | checker | all — what `python -m app.main` runs.
+    ROLE: str = "all"
+    # Prometheus /metrics port; 0 turns the endpoint off.
+    METRICS_PORT: int = 9100
+
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+
+    HTTP_POOL_LIMIT: int = 100
+    HTTP_POOL_LIMIT_PER_HOST: int = 10
+    HTTP_DNS_CACHE_SECONDS: int = 300
+    HTTP_KEEPALIVE_SECONDS: float = 30.0
+    HTTP_TIMEOUT_SECONDS: float = 20.0
+
+    PRICE_CACHE_TTL_CRYPTO: float = 60.0
+    PRICE_CACHE_TTL_FX: float = 300.0
+    PRICE_CACHE_STALE_SECONDS: float = 300.0
+    PRICE_CACHE_MAX_SIZE: int = 10_000
+
+    COIN_CATALOG_REFRESH_HOURS: float = 24
+    # /coins/markets pages (250 coins each) fetched for market cap ranks.
+    COIN_CATALOG_RANKED_PAGES: int = 4
+
+    COINGECKO_CONCURRENCY: int = 2
+    COINGECKO_REQUESTS_PER_MINUTE: float = 30
+    # Crypto is fetched in this quote and converted to the others with fx
+    # rates, except CRYPTO_NATIVE_QUOTES (and quotes fx can't price), which
+    # CoinGecko is asked for directly. Empty: ask for every quote.
+    CRYPTO_ANCHOR_QUOTE: str = "usd"
+    CRYPTO_NATIVE_QUOTES: list[str] = [
+        "btc", "eth", "ltc", "bch", "bnb", "eos", "xrp", "xlm", "link", "dot", "yfi", "sol", "bits", "sats",
+        "xag", "xau",
+    ]
+    FRANKFURTER_CONCURRENCY: int = 8
+    # How long one Frankfurter rate vector (every currency against EUR) is used.
+    FRANKFURTER_REFRESH_SECONDS: float = 300.0
+    PROVIDER_TIMEOUT_SECONDS: float = 10.0
+
+    NOTIFY_WORKERS: int = 8
+    NOTIFY_RATE_PER_SECOND: float = 30.0
+    NOTIFY_PER_CHAT_PER_SECOND: float = 1.0
+    NOTIFY_MAX_RETRIES: int = 3
+    NOTIFY_QUEUE_SIZE: int = 100_000
+
+    # Alerts go through the alert_outbox table: each sender claims this
+    # many rows at a time and owns them for OUTBOX_LEASE_SECONDS.
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_LEASE_SECONDS: float = 60.0
+    # Fallback poll when no NOTIFY arrives.
+    OUTBOX_POLL_SECONDS: float = 5.0
+    OUTBOX_MAX_ATTEMPTS: int = 10
+
+    # Pairs are split into this many partitions (pair id modulo N) that
+    # checker workers claim; keep it well above the number of workers.
+    CHECKER_PARTITIONS: int = 64
+    # How often the polling checker's in-memory trackers are checked against the table.
+    TRACKER_RESYNC_SECONDS: float = 300.0
+
+    # polling: check every CHECK_INTERVAL_SECONDS; stream: evaluate on every
+    # update from PRICE_STREAM_URL, polling the REST providers while the
+    # stream is silent for PRICE_STREAM_STALE_SECONDS; adaptive: poll each
+    # pair as often as its distance to the nearest target calls for.
+    PRICE_SOURCE: str = "polling"
+    PRICE_STREAM_URL: str = ""
+    PRICE_STREAM_STALE_SECONDS: float = 30.0
+
+    ADAPTIVE_MIN_INTERVAL_SECONDS: float = 5.0
+    ADAPTIVE_MAX_INTERVAL_SECONDS: float = 600.0
+    # Fraction of the expected time-to-target to wait between checks.
+    ADAPTIVE_SAFETY: float = 0.25
+    # Upstream requests per minute the adaptive poller may spend per provider.
+    ADAPTIVE_BUDGETS: dict[str, float] = {"coingecko": 20, "frankfurter": 30}
 
 settings = Settings()
@@ -1,8 +1,10 @@
 import asyncio
 from sqlalchemy import text
 from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncConnection
 from app.db.session import engine
 from app.db.base import Base
+from app.db import models  # noqa: F401  (register tables on Base.metadata)
 
 async def wait_for_db(max_tries: int = 60, delay_seconds: float = 1.0) -> None:
     last_err: Exception | None = None
@@ -16,10 +18,103 @@ async def wait_for_db(max_tries: int = 60, delay_seconds: float = 1.0) -> None:
             await asyncio.sleep(delay_seconds)
     raise RuntimeError(f"Database is not ready after {max_tries} tries: {last_err}")
 
-async def create_tables() -> None:
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+# Serialises schema setup when several processes (bot, checkers) start at once.
+_SCHEMA_LOCK_KEY = 0x50544200
+
+async def create_tables(conn: AsyncConnection) -> None:
+    await conn.run_sync(Base.metadata.create_all)
+
+async def upgrade_schema(conn: AsyncConnection) -> None:
+    """
+    In-place upgrades for databases created before a table/column existed
+    (create_all only creates missing tables). Every step is idempotent.
+    """
+    await conn.execute(text(
+        "ALTER TABLE trackers ADD COLUMN IF NOT EXISTS pair_id INTEGER REFERENCES price_pairs(id)"
+    ))
+    await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_trackers_pair_id ON trackers (pair_id)"))
+    # Stamped by the database: checkers compare it with prices checked on
+    # the database clock, whatever the clocks of the bot's host say.
+    await conn.execute(text("ALTER TABLE trackers ALTER COLUMN created_at SET DEFAULT now()"))
+
+    legacy = (await conn.execute(text(
+        "SELECT 1 FROM information_schema.columns "
+        "WHERE table_name = 'trackers' AND column_name = 'last_price'"
+    ))).first() is not None
+    # Carry the per-tracker price state over so the first tick after the
+    # upgrade doesn't re-fire every already-satisfied tracker.
+    state = "max(last_price), max(last_checked_at)" if legacy else "NULL, NULL"
+    await conn.execute(text(
+        "INSERT INTO price_pairs (kind, coin_id, base, quote, last_price, last_checked_at, active_trackers) "
+        f"SELECT kind, coin_id, base, quote, {state}, 0 FROM trackers "
+        "WHERE pair_id IS NULL GROUP BY kind, coin_id, base, quote "
+        "ON CONFLICT DO NOTHING"
+    ))
+    await conn.execute(text(
+        "UPDATE trackers t SET pair_id = p.id FROM price_pairs p "
+        "WHERE t.pair_id IS NULL AND p.kind = t.kind AND p.coin_id IS NOT DISTINCT FROM t.coin_id "
+        "AND p.base = t.base AND p.quote = t.quote"
+    ))
+    if legacy:
+        await conn.execute(text("ALTER TABLE trackers DROP COLUMN last_price"))
+        await conn.execute(text("ALTER TABLE trackers DROP COLUMN IF EXISTS last_checked_at"))
+
+    # Refcounts are maintained by the handlers; recount at startup in case
+    # a crash or manual edit left them off.
+    await conn.execute(text(
+        "UPDATE price_pairs p SET active_trackers = "
+        "(SELECT count(*) FROM trackers t WHERE t.pair_id = p.id AND t.is_active)"
+    ))
+
+# Statement-level, so bulk writes cost one notification: the changed
+# tracker ids, or "*" when there are more than fit in a payload.
+_TRACKER_NOTIFY_FUNCTION = """
+CREATE OR REPLACE FUNCTION notify_tracker_changes() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    changed integer[];
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        PERFORM pg_notify('tracker_changes', '*');
+        RETURN NULL;
+    ELSIF TG_OP = 'INSERT' THEN
+        SELECT array_agg(id) INTO changed FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(id) INTO changed FROM old_rows;
+    ELSE
+        -- Skip the checker's own last_triggered_at writes.
+        SELECT array_agg(n.id) INTO changed FROM new_rows n JOIN old_rows o ON o.id = n.id
+        WHERE (n.is_active, n.target, n.direction, n.pair_id, n.tg_user_id)
+            IS DISTINCT FROM (o.is_active, o.target, o.direction, o.pair_id, o.tg_user_id);
+    END IF;
+    IF changed IS NOT NULL THEN
+        PERFORM pg_notify('tracker_changes', CASE
+            WHEN cardinality(changed) > 500 THEN '*'
+            ELSE array_to_string(changed, ',')
+        END);
+    END IF;
+    RETURN NULL;
+END $$
+"""
+
+_TRACKER_TRIGGERS = {
+    "trackers_notify_insert": "AFTER INSERT ON trackers REFERENCING NEW TABLE AS new_rows",
+    "trackers_notify_update": "AFTER UPDATE ON trackers REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    "trackers_notify_delete": "AFTER DELETE ON trackers REFERENCING OLD TABLE AS old_rows",
+    "trackers_notify_truncate": "AFTER TRUNCATE ON trackers",
+}
+
+async def install_triggers(conn: AsyncConnection) -> None:
+    """Change notifications for the checkers' tracker snapshots (see app.services.tracker_snapshot)."""
+    await conn.execute(text(_TRACKER_NOTIFY_FUNCTION))
+    for name, when in _TRACKER_TRIGGERS.items():
+        await conn.execute(text(
+            f"CREATE OR REPLACE TRIGGER {name} {when} FOR EACH STATEMENT EXECUTE FUNCTION notify_tracker_changes()"
+        ))
 
 async def init_db() -> None:
     await wait_for_db()
-    await create_tables()
+    async with engine.begin() as conn:
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _SCHEMA_LOCK_KEY})
+        await create_tables(conn)
+        await upgrade_schema(conn)
+        await install_triggers(conn)
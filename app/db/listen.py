@@ -0,0 +1,39 @@
+from __future__ import annotations
+from typing import Callable
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+
+async def listen(
+    engine: AsyncEngine,
+    channel: str,
+    on_notify: Callable[[str], None],
+    on_lost: Callable[[], None] | None = None,
+) -> AsyncConnection:
+    """
+    LISTENs on `channel` over a dedicated connection, calling
+    `on_notify(payload)` per notification and `on_lost()` if the connection
+    drops (notifications sent meanwhile are gone). Stop with `unlisten()`.
+    """
+    conn = await engine.connect()
+    try:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        raw = (await conn.get_raw_connection()).driver_connection
+        await raw.add_listener(channel, lambda _conn, _pid, _channel, payload: on_notify(payload))
+        if on_lost is not None:
+            raw.add_termination_listener(lambda _conn: on_lost())
+    except BaseException:
+        await conn.close()
+        raise
+    return conn
+
+
+async def unlisten(conn: AsyncConnection) -> None:
+    """
+    Stops a `listen()`: the connection is discarded rather than pooled, so
+    its LISTEN and callbacks can't follow it to the next user.
+    """
+    try:
+        await conn.invalidate()
+        await conn.close()
+    except Exception:
+        pass
@@ -1,6 +1,6 @@
 import enum
 from datetime import datetime
-from sqlalchemy import BigInteger, Boolean, DateTime, Enum, Integer, Numeric, String, Index
+from sqlalchemy import BigInteger, Boolean, DateTime, Enum, ForeignKey, Integer, Numeric, String, Text, Index, func
 from sqlalchemy.orm import Mapped, mapped_column
 from .base import Base
 
@@ -12,6 +12,37 @@ class Direction(str, enum.Enum):
     gte = "gte"
     lte = "lte"
 
+class PricePair(Base):
+    """
+    One row per distinct (kind, coin_id, base, quote) that any tracker follows.
+    Price state lives here so the checker reads and writes once per pair.
+    """
+    __tablename__ = "price_pairs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+
+    kind: Mapped[TrackerKind] = mapped_column(Enum(TrackerKind, name="tracker_kind"))
+    coin_id: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    base: Mapped[str] = mapped_column(String(16))
+    quote: Mapped[str] = mapped_column(String(16))
+
+    last_price: Mapped[float | None] = mapped_column(Numeric(20, 8), nullable=True)
+    last_checked_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    # Number of active trackers on this pair; the checker skips pairs at 0.
+    active_trackers: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+
+Index(
+    "uq_price_pairs_pair",
+    PricePair.kind,
+    PricePair.coin_id,
+    PricePair.base,
+    PricePair.quote,
+    unique=True,
+    postgresql_nulls_not_distinct=True,
+)
+Index("ix_price_pairs_active", PricePair.active_trackers)
+
 class Tracker(Base):
     __tablename__ = "trackers"
 
@@ -28,15 +59,53 @@ class Tracker(Base):
     base: Mapped[str] = mapped_column(String(16))
     quote: Mapped[str] = mapped_column(String(16))
 
+    pair_id: Mapped[int | None] = mapped_column(ForeignKey("price_pairs.id"), nullable=True, index=True)
+
     direction: Mapped[Direction] = mapped_column(Enum(Direction, name="direction"))
     target: Mapped[float] = mapped_column(Numeric(20, 8))
 
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
 
-    last_price: Mapped[float | None] = mapped_column(Numeric(20, 8), nullable=True)
-    last_checked_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     last_triggered_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
 Index("ix_trackers_user_active", Tracker.tg_user_id, Tracker.is_active)
+
+class Coin(Base):
+    """CoinGecko coin catalog, refreshed periodically; backs the local coin search."""
+    __tablename__ = "coins"
+
+    id: Mapped[str] = mapped_column(String(128), primary_key=True)
+    symbol: Mapped[str] = mapped_column(String(64))
+    name: Mapped[str] = mapped_column(String(256))
+    market_cap_rank: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+
+class AlertOutbox(Base):
+    """
+    Alert messages waiting for delivery. Written in the checker's
+    transaction and deleted once Telegram has accepted them.
+    """
+    __tablename__ = "alert_outbox"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    chat_id: Mapped[int] = mapped_column(BigInteger)
+    text: Mapped[str] = mapped_column(Text)
+    parse_mode: Mapped[str | None] = mapped_column(String(16), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    # Not claimable before this; claiming pushes it a lease ahead, so rows
+    # of a sender that died come back on their own.
+    available_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # Set when delivery can't succeed (blocked bot, bad markup); kept for inspection.
+    failed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_error: Mapped[str | None] = mapped_column(String(128), nullable=True)
+
+Index(
+    "ix_alert_outbox_pending",
+    AlertOutbox.available_at,
+    AlertOutbox.id,
+    postgresql_where=AlertOutbox.failed_at.is_(None),
+)
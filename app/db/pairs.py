@@ -0,0 +1,36 @@
+from __future__ import annotations
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import PricePair, TrackerKind
+
+
+async def acquire_pair(
+    session: AsyncSession,
+    kind: TrackerKind,
+    coin_id: str | None,
+    base: str,
+    quote: str,
+) -> int:
+    """Returns the pair id, creating the pair if needed, and counts one more active tracker on it."""
+    stmt = (
+        insert(PricePair)
+        .values(kind=kind, coin_id=coin_id, base=base, quote=quote, active_trackers=1)
+        .on_conflict_do_update(
+            index_elements=[PricePair.kind, PricePair.coin_id, PricePair.base, PricePair.quote],
+            set_={"active_trackers": PricePair.active_trackers + 1},
+        )
+        .returning(PricePair.id)
+    )
+    return (await session.execute(stmt)).scalar_one()
+
+
+async def adjust_pair(session: AsyncSession, pair_id: int | None, delta: int) -> None:
+    """Changes the active tracker count of a pair (e.g. on pause/resume/delete)."""
+    if pair_id is None or not delta:
+        return
+    await session.execute(
+        update(PricePair)
+        .where(PricePair.id == pair_id)
+        .values(active_trackers=PricePair.active_trackers + delta)
+    )
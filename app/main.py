@@ -1,3 +1,4 @@
+import argparse
 import asyncio
 import logging
 from aiogram import Bot, Dispatcher
@@ -5,7 +6,27 @@ from aiogram.fsm.storage.memory import MemoryStorage
 from app.config import settings
 from app.bot.router import root_router
 from app.db.init_db import init_db
+from app.db.session import engine
 from app.scheduler import build_scheduler
+from app.services.adaptive_checker import AdaptiveChecker
+from app.services.http import create_http_session
+from app.services import metrics
+from app.services.notifier import create_notifier
+from app.services.outbox import create_outbox_sender
+from app.services.partitions import PartitionLeaser
+from app.services.pipeline import CheckerPipeline
+from app.services.prices.cache import create_price_cache
+from app.services.prices.catalog import create_coin_catalog
+from app.services.prices.fetch import fetch_prices
+from app.services.prices.providers import create_price_router
+from app.services.prices.stored import stored_price
+from app.services.prices.streaming import FallbackPriceSource, PollingPriceSource, WebSocketPriceSource
+from app.services.streaming_checker import StreamingChecker
+from app.services.tracker_snapshot import TrackerSnapshot
+
+ROLES = ("bot", "checker", "all")
+
+log = logging.getLogger(__name__)
 
 def setup_logging():
     logging.basicConfig(
@@ -13,23 +34,121 @@ def setup_logging():
         format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
     )
 
-async def main() -> None:
+async def main(role: str = "all") -> None:
+    """
+    bot     — Telegram polling and handlers only
+    checker — periodic price checks and alert delivery only (see app.worker)
+    all     — both in one process
+    """
+    if role not in ROLES:
+        raise ValueError(f"Unknown role {role!r}, expected one of {ROLES}")
     setup_logging()
+    log.info("Starting role %s", role)
 
     await init_db()
+    metrics.instrument_engine(engine)
+    metrics_runner = await metrics.start_metrics_server(settings.METRICS_PORT) if settings.METRICS_PORT else None
     
     bot = Bot(token=settings.BOT_TOKEN)
-    dp = Dispatcher(storage=MemoryStorage())
-    dp.include_router(root_router)
+    http = create_http_session()
+    # A bot-only process checks no prices itself; it serves the ones the
+    # checkers stored before asking the providers.
+    price_cache = create_price_cache(stored_price if role == "bot" else None)
+    price_router = create_price_router(http)
+
+    notifier = None
+    outbox = None
+    leaser = None
+    scheduler = None
+    pipeline = None
+    snapshot = None
+    checker_task = None
+    catalog_task = None
+    if role in ("checker", "all"):
+        notifier = create_notifier(bot)
+        notifier.start()
+        metrics.ALERTS_QUEUED.set_function(lambda: notifier.queue_depth)
+        outbox = create_outbox_sender(notifier, engine)
+        outbox.start()
+        metrics.TICK_INTERVAL_SECONDS.set(settings.CHECK_INTERVAL_SECONDS)
 
-    scheduler = build_scheduler(bot)
-    scheduler.start()
+        # Every checker claims partitions, so any number of checker
+        # processes can run side by side.
+        leaser = PartitionLeaser(engine, settings.CHECKER_PARTITIONS)
+        snapshot = TrackerSnapshot(engine, settings.TRACKER_RESYNC_SECONDS)
+        await snapshot.start()
+        if settings.PRICE_SOURCE == "stream":
+            source = FallbackPriceSource(
+                WebSocketPriceSource(http, settings.PRICE_STREAM_URL),
+                PollingPriceSource(
+                    lambda pairs: fetch_prices(pairs, price_router, price_cache),
+                    settings.CHECK_INTERVAL_SECONDS,
+                ),
+                stale_after=settings.PRICE_STREAM_STALE_SECONDS,
+            )
+            checker = StreamingChecker(source, price_cache, snapshot, leaser)
+            checker_task = asyncio.create_task(checker.run())
+        elif settings.PRICE_SOURCE == "adaptive":
+            checker = AdaptiveChecker(
+                price_router,
+                price_cache,
+                snapshot,
+                settings.ADAPTIVE_BUDGETS,
+                leaser,
+                min_interval=settings.ADAPTIVE_MIN_INTERVAL_SECONDS,
+                max_interval=settings.ADAPTIVE_MAX_INTERVAL_SECONDS,
+                safety=settings.ADAPTIVE_SAFETY,
+            )
+            checker_task = asyncio.create_task(checker.run())
+        else:
+            pipeline = CheckerPipeline(price_router, price_cache, snapshot)
+            pipeline.start()
+            scheduler = build_scheduler(pipeline, leaser)
+            scheduler.start()
     
     try:
-        await dp.start_polling(bot)
+        if role in ("bot", "all"):
+            coin_catalog = create_coin_catalog(http)
+            await coin_catalog.load()
+            catalog_task = asyncio.create_task(coin_catalog.run())
+            dp = Dispatcher(
+                storage=MemoryStorage(),
+                http=http,
+                price_cache=price_cache,
+                price_router=price_router,
+                coin_catalog=coin_catalog,
+            )
+            for observer in (dp.message, dp.callback_query):
+                observer.middleware(metrics.HandlerMetricsMiddleware(observer.event_name))
+            dp.include_router(root_router)
+            await dp.start_polling(bot)
+        elif checker_task is not None:
+            await checker_task
+        else:
+            await asyncio.Event().wait()
     finally:
-        scheduler.shutdown(wait=False)
+        if scheduler is not None:
+            scheduler.shutdown(wait=False)
+        if pipeline is not None:
+            await pipeline.stop()
+        for task in (checker_task, catalog_task):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        if snapshot is not None:
+            await snapshot.stop()
+        if leaser is not None:
+            await leaser.close()
+        if outbox is not None:
+            await outbox.stop()
+        if notifier is not None:
+            await notifier.stop()
+        await http.close()
         await bot.session.close()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--role", choices=ROLES, default=settings.ROLE)
+    asyncio.run(main(parser.parse_args().role))
@@ -1,20 +1,37 @@
 from __future__ import annotations
 
+import asyncio
+import logging
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
-from aiogram import Bot
 
 from app.config import settings
-from app.db.session import SessionLocal
-from app.services.checker import check_prices_and_notify
+from app.services.metrics import TICK_FAILURES
+from app.services.partitions import PartitionLeaser
+from app.services.pipeline import CheckerPipeline
 
-def build_scheduler(bot: Bot) -> AsyncIOScheduler:
+log = logging.getLogger(__name__)
+
+def build_scheduler(pipeline: CheckerPipeline, leaser: PartitionLeaser | None = None) -> AsyncIOScheduler:
+    """
+    Runs the pipeline's fetch stage every CHECK_INTERVAL_SECONDS; evaluating
+    and storing happen in the pipeline's own tasks, so a slow commit doesn't
+    hold up the next fetch.
+    """
     scheduler = AsyncIOScheduler(timezone=settings.TIMEZONE)
 
+    async def drain(_partitions: set[int]) -> None:
+        # Partitions are only handed over once their fetched prices are stored.
+        await asyncio.wait_for(pipeline.drain(), settings.CHECK_INTERVAL_SECONDS)
+
     async def job():
-        async with SessionLocal() as session:
-            await check_prices_and_notify(bot, session)
-            
+        partitions = await pipeline.snapshot.claim_partitions(leaser, drain)
+        try:
+            await pipeline.fetch(partitions)
+        except Exception:
+            TICK_FAILURES.inc()
+            raise
+
     scheduler.add_job(
         job,
         trigger=IntervalTrigger(seconds=settings.CHECK_INTERVAL_SECONDS),
@@ -0,0 +1,269 @@
+from __future__ import annotations
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Mapping, Sequence
+from app.services.metrics import TICK_FAILURES, observe_tick
+from app.services.partitions import PartitionLeaser
+from app.services.prices.cache import PriceCache
+from app.services.prices.fetch import fetch_prices
+from app.services.prices.registry import PriceProvider, PriceRouter
+from app.services.prices.types import PairKey
+from app.services.ratelimit import TokenBucket
+from app.services.timing import PhaseTimer
+from app.services.tracker_snapshot import TrackerSnapshot
+
+log = logging.getLogger(__name__)
+
+# Typical one-minute log-price moves, used until a pair has history of its own.
+PRIOR_VOLATILITY_PER_MINUTE = {"crypto": 0.003, "fx": 0.0005}
+# Half-life of the per-pair volatility estimate.
+VOLATILITY_HALFLIFE_SECONDS = 3600.0
+
+
+class PairSchedule:
+    """Polling state of one pair."""
+
+    __slots__ = ("pair_id", "key", "gte", "lte", "price", "seen_at", "variance", "due")
+
+    def __init__(self, pair_id: int, key: PairKey, gte: Sequence[float], lte: Sequence[float]) -> None:
+        self.pair_id = pair_id
+        self.key = key
+        self.gte = gte
+        self.lte = lte
+        self.price: float | None = None
+        self.seen_at = 0.0
+        # Variance of the log price per second.
+        self.variance = PRIOR_VOLATILITY_PER_MINUTE.get(key[0], 0.003) ** 2 / 60
+        self.due = 0.0
+
+    def observe(self, price: float, now: float) -> None:
+        if self.price is not None and self.price > 0 and price > 0 and now > self.seen_at:
+            dt = now - self.seen_at
+            sample = math.log(price / self.price) ** 2 / dt
+            alpha = 1 - 0.5 ** (dt / VOLATILITY_HALFLIFE_SECONDS)
+            self.variance += alpha * (sample - self.variance)
+        self.price = price
+        self.seen_at = now
+
+    def gap(self) -> float | None:
+        """
+        Log distance from the price to the nearest target it could fire by
+        moving there: gte targets above it, lte targets below it.
+        """
+        price = self.price
+        if price is None or price <= 0:
+            return None
+        gaps = []
+        i = bisect_right(self.gte, price)
+        if i < len(self.gte):
+            gaps.append(math.log(self.gte[i] / price))
+        j = bisect_left(self.lte, price)
+        if j > 0 and self.lte[j - 1] > 0:
+            gaps.append(math.log(price / self.lte[j - 1]))
+        return min(gaps) if gaps else None
+
+    def interval(self, min_interval: float, max_interval: float, safety: float) -> float:
+        """
+        A random walk needs about (gap / sigma)^2 seconds to cover `gap`;
+        poll `safety` times that, within the bounds.
+        """
+        if self.price is None:
+            return min_interval
+        gap = self.gap()
+        if gap is None or self.variance <= 0:
+            return max_interval
+        return min(max_interval, max(min_interval, safety * gap * gap / self.variance))
+
+
+class AdaptiveChecker:
+    """
+    Polls every pair on its own schedule instead of all of them every
+    CHECK_INTERVAL_SECONDS: pairs whose price is close to a tracker's target
+    (relative to how much they've been moving) are checked every few
+    seconds, quiet pairs far from any target rarely.
+
+    Pairs wait in a heap ordered by due time. Each provider has a request
+    budget per minute; when more pairs are due than it allows, the most
+    overdue go first and the rest wait for the budget to refill.
+
+    Pairs, targets and stored prices come from the resident TrackerSnapshot,
+    so a poll only touches the database to commit.
+    """
+
+    def __init__(
+        self,
+        router: PriceRouter,
+        price_cache: PriceCache,
+        snapshot: TrackerSnapshot,
+        budgets: Mapping[str, float],
+        leaser: PartitionLeaser | None = None,
+        min_interval: float = 5.0,
+        max_interval: float = 600.0,
+        safety: float = 0.25,
+        refresh_seconds: float = 30.0,
+    ) -> None:
+        self.router = router
+        self.price_cache = price_cache
+        self.snapshot = snapshot
+        self.leaser = leaser
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.safety = safety
+        self.refresh_seconds = refresh_seconds
+        self._budgets = {
+            name: TokenBucket(rpm / 60.0, max(1.0, rpm / 6.0)) for name, rpm in budgets.items() if rpm > 0
+        }
+        self._pairs: dict[int, PairSchedule] = {}
+        self._heap: list[tuple[float, int, int]] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        # Held while a poll fetches, evaluates and stores, so partitions are
+        # only given up between polls.
+        self._lock = asyncio.Lock()
+
+    def _schedule(self, s: PairSchedule, due: float) -> None:
+        s.due = due
+        heapq.heappush(self._heap, (due, next(self._seq), s.pair_id))
+
+    async def refresh(self) -> None:
+        """
+        Reschedules the pairs this process owns from the tracker snapshot.
+        Runs between polls, so partitions are given up with nothing in flight.
+        """
+        async with self._lock:
+            partitions = await self.snapshot.claim_partitions(self.leaser)
+            self._reschedule(self.snapshot.active_pairs(partitions))
+        self._wakeup.set()
+
+    def _reschedule(self, keys: Mapping[int, PairKey]) -> None:
+        now = time.monotonic()
+        tracked = self.snapshot.table.pairs
+        pairs: dict[int, PairSchedule] = {}
+        for pid, key in keys.items():
+            # Copies: the snapshot's arrays change in place.
+            gte, lte = tracked[pid].gte.targets[:], tracked[pid].lte.targets[:]
+            s = self._pairs.get(pid)
+            if s is None:
+                s = PairSchedule(pid, key, gte, lte)
+                self._schedule(s, now)
+            elif s.gte != gte or s.lte != lte:
+                # New trackers are evaluated on the pair's next check: make it soon.
+                s.gte, s.lte = gte, lte
+                self._schedule(s, now)
+            pairs[pid] = s
+        self._pairs = pairs
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.refresh()
+            except Exception:
+                log.exception("Failed to refresh adaptive polling pairs")
+
+    def _pop_due(self, now: float) -> list[PairSchedule]:
+        due: list[PairSchedule] = []
+        while self._heap and self._heap[0][0] <= now:
+            at, _, pid = heapq.heappop(self._heap)
+            s = self._pairs.get(pid)
+            # Skip stale heap entries of rescheduled or dropped pairs.
+            if s is not None and s.due == at:
+                due.append(s)
+        return due
+
+    def _within_budget(self, provider: PriceProvider, due: list[PairSchedule]) -> int:
+        """How many of `due` (most overdue first) this tick can afford; spends the budget."""
+        bucket = self._budgets.get(provider.name)
+        if bucket is None:
+            return len(due)
+        tokens = math.floor(bucket.available())
+        keys = [s.key for s in due]
+        if provider.requests_for(keys) <= tokens:
+            n = len(due)
+        else:
+            lo, hi = 0, len(due)
+            while lo < hi:
+                mid = (lo + hi + 1) // 2
+                if provider.requests_for(keys[:mid]) <= tokens:
+                    lo = mid
+                else:
+                    hi = mid - 1
+            n = lo
+        bucket.spend(provider.requests_for(keys[:n]))
+        return n
+
+    async def _poll(self, due: list[PairSchedule]) -> None:
+        async with self._lock:
+            # Pairs released while waiting for the lock are someone else's now.
+            await self._poll_owned([s for s in due if self._pairs.get(s.pair_id) is s])
+
+    async def _poll_owned(self, due: list[PairSchedule]) -> None:
+        now = time.monotonic()
+        by_provider: dict[PriceProvider, list[PairSchedule]] = defaultdict(list)
+        for s in due:
+            provider = self.router.route(s.key)
+            if provider is None:
+                self._schedule(s, now + self.max_interval)
+            else:
+                by_provider[provider].append(s)
+
+        polled: list[PairSchedule] = []
+        for provider, group in by_provider.items():
+            n = self._within_budget(provider, group)
+            polled.extend(group[:n])
+            for s in group[n:]:
+                # Over budget: retry as soon as a request's worth has refilled.
+                bucket = self._budgets[provider.name]
+                self._schedule(s, now + max(1.0, 1.0 / bucket.rate))
+        if not polled:
+            return
+
+        timer = PhaseTimer()
+        start = time.perf_counter()
+        try:
+            with timer.phase("fetch"):
+                prices = await fetch_prices({s.key for s in polled}, self.router, self.price_cache)
+            now = time.monotonic()
+            pair_prices: dict[int, float] = {}
+            for s in polled:
+                price = prices.get(s.key)
+                if price is None:
+                    self._schedule(s, now + self.min_interval)
+                    continue
+                s.observe(price, now)
+                pair_prices[s.pair_id] = price
+                self._schedule(s, now + s.interval(self.min_interval, self.max_interval, self.safety))
+            if pair_prices:
+                await self.snapshot.check(pair_prices, timer)
+        except Exception:
+            TICK_FAILURES.inc()
+            log.exception("Failed to check %d pair(s)", len(polled))
+            now = time.monotonic()
+            for s in polled:
+                if s.due <= now:
+                    self._schedule(s, now + self.min_interval)
+        observe_tick(timer, time.perf_counter() - start)
+
+    async def run(self) -> None:
+        await self.refresh()
+        refresh_task = asyncio.create_task(self._refresh_loop())
+        try:
+            while True:
+                wait = self._heap[0][0] - time.monotonic() if self._heap else self.max_interval
+                if wait > 0:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._poll(self._pop_due(time.monotonic()))
+        finally:
+            refresh_task.cancel()
+            await asyncio.gather(refresh_task, return_exceptions=True)
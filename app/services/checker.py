@@ -1,15 +1,17 @@
 from __future__ import annotations
+import logging
 from collections import defaultdict
-from datetime import datetime, timezone
+from datetime import datetime
 from decimal import Decimal
 from typing import Any
-import aiohttp
-from aiogram import Bot
-from sqlalchemy import select
+from sqlalchemy import bindparam, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.models import Tracker, TrackerKind, Direction
-from app.services.prices.coingecko import CoinGeckoClient
-from app.services.prices.frankfurter import FrankfurterClient
+from app.db.models import PricePair, Tracker, Direction
+from app.services.outbox import enqueue_alerts
+
+log = logging.getLogger(__name__)
+
+TELEGRAM_MESSAGE_LIMIT = 4096
 
 
 def _to_float(x: Any) -> float | None:
@@ -27,102 +29,95 @@ def _to_float(x: Any) -> float | None:
         return None
 
 
-def _crossed(direction: Direction, last_price: float | None, current_price: float, target: float) -> bool:
-    if direction == Direction.gte:
-        if last_price is None:
-            return current_price >= target
-        return last_price < target and current_price >= target
-
-    if last_price is None:
-        return current_price <= target
-    return last_price > target and current_price <= target
-
-
 def _fmt_tracker(t: Tracker) -> str:
     arrow = "≥" if t.direction == Direction.gte else "≤"
     status = "🟢" if t.is_active else "⏸"
     return f"{status} #{t.id} • {t.base}/{t.quote} • alert: {arrow} {t.target}"
 
 
-async def check_prices_and_notify(bot: Bot, session: AsyncSession) -> None:
-    res = await session.execute(select(Tracker).where(Tracker.is_active == True))
-    trackers: list[Tracker] = list(res.scalars().all())
-    if not trackers:
-        return
-
-    now = datetime.now(timezone.utc)
-
-    crypto = [t for t in trackers if t.kind == TrackerKind.crypto]
-    fx = [t for t in trackers if t.kind == TrackerKind.fx]
-
-    async with aiohttp.ClientSession(headers={"User-Agent": "price-tracker-bot/1.0"}) as http:
-        cg = CoinGeckoClient(http)
-        ff = FrankfurterClient(http)
-
-        crypto_by_quote: dict[str, list[Tracker]] = defaultdict(list)
-        for t in crypto:
-            crypto_by_quote[t.quote.lower()].append(t)
-
-        crypto_prices: dict[tuple[str, str], float] = {}
-        for quote, items in crypto_by_quote.items():
-            ids = [t.coin_id for t in items if t.coin_id]
-            if not ids:
-                continue
-            data = await cg.simple_price(ids, [quote])
-            for t in items:
-                if not t.coin_id:
-                    continue
-                p = (data.get(t.coin_id) or {}).get(quote)
-                if p is not None:
-                    crypto_prices[(t.coin_id, quote)] = float(p)
-
-        fx_by_base: dict[str, list[Tracker]] = defaultdict(list)
-        for t in fx:
-            fx_by_base[t.base.upper()].append(t)
-
-        fx_prices: dict[tuple[str, str], float] = {}
-        for base, items in fx_by_base.items():
-            quotes = [t.quote.upper() for t in items]
-            rates = await ff.latest(base, quotes)
-            for t in items:
-                rate = rates.get(t.quote.upper())
-                if rate is not None:
-                    fx_prices[(t.base.upper(), t.quote.upper())] = float(rate)
-
-    updates = 0
-    for t in trackers:
-        current_price: float | None = None
-
-        if t.kind == TrackerKind.crypto and t.coin_id:
-            current_price = crypto_prices.get((t.coin_id, t.quote.lower()))
-        elif t.kind == TrackerKind.fx:
-            current_price = fx_prices.get((t.base.upper(), t.quote.upper()))
-
-        t.last_checked_at = now
-
-        if current_price is None:
-            continue
-
-        last = _to_float(t.last_price)
-        target = float(t.target)
-
-        if _crossed(t.direction, last, current_price, target):
-            arrow = "≥" if t.direction == Direction.gte else "≤"
-            txt = (
-                "🔔 <b>Price alert!</b>\n\n"
-                f"{t.base}/{t.quote}\n"
-                f"Current price: <b>{current_price:.8f}</b>\n"
-                f"Condition: <b>{t.base}/{t.quote} {arrow} {target}</b>\n\n"
-                "Manage: /trackers"
-            )
-            try:
-                await bot.send_message(t.tg_user_id, txt, parse_mode="HTML")
-                t.last_triggered_at = now
-            except Exception:
-                pass
-
-        t.last_price = current_price
-        updates += 1
-
-    if updates:
-        await session.commit()
+def _fmt_alert(t: Any, current_price: float) -> str:
+    arrow = "≥" if t.direction == Direction.gte else "≤"
+    return (
+        f"#{t.id} • {t.base}/{t.quote} {arrow} {float(t.target)}\n"
+        f"Current price: <b>{current_price:.8f}</b>"
+    )
+
+
+def _render_alerts(alerts: list[tuple[Any, float]]) -> list[str]:
+    """
+    All alerts of one user for a tick, as few messages as Telegram's
+    message length limit allows.
+    """
+    if len(alerts) == 1:
+        t, current_price = alerts[0]
+        arrow = "≥" if t.direction == Direction.gte else "≤"
+        return [
+            "🔔 <b>Price alert!</b>\n\n"
+            f"{t.base}/{t.quote}\n"
+            f"Current price: <b>{current_price:.8f}</b>\n"
+            f"Condition: <b>{t.base}/{t.quote} {arrow} {float(t.target)}</b>\n\n"
+            "Manage: /trackers"
+        ]
+
+    header = f"🔔 <b>Price alerts ({len(alerts)})</b>\n\n"
+    footer = "\n\nManage: /trackers"
+    budget = TELEGRAM_MESSAGE_LIMIT - len(header) - len(footer)
+    messages: list[str] = []
+    blocks: list[str] = []
+    size = 0
+    for t, current_price in alerts:
+        block = _fmt_alert(t, current_price)
+        extra = len(block) + (2 if blocks else 0)
+        if blocks and size + extra > budget:
+            messages.append(header + "\n\n".join(blocks) + footer)
+            blocks, size, extra = [], 0, len(block)
+        blocks.append(block)
+        size += extra
+    messages.append(header + "\n\n".join(blocks) + footer)
+    return messages
+
+
+def alert_messages(fired: list[tuple[Any, float]]) -> list[tuple[int, str]]:
+    """(chat_id, text) of the messages announcing `fired`, grouped per user."""
+    by_user: dict[int, list[tuple[Any, float]]] = defaultdict(list)
+    for t, current_price in fired:
+        by_user[t.tg_user_id].append((t, current_price))
+    return [(user_id, txt) for user_id, alerts in by_user.items() for txt in _render_alerts(alerts)]
+
+
+async def store_prices(
+    session: AsyncSession,
+    pair_prices: dict[int, float],
+    fired: list[tuple[Any, float]],
+    now: datetime,
+) -> None:
+    """
+    Commits the new prices, the fired trackers and their alerts' outbox
+    rows in one transaction: an alert is sent (later, by the outbox
+    sender) exactly when its tracker's trigger is stored.
+    """
+    await _write_back(session, pair_prices, [t.id for t, _ in fired], now)
+    await enqueue_alerts(session, alert_messages(fired))
+    await session.commit()
+
+
+async def _write_back(
+    session: AsyncSession,
+    pair_prices: dict[int, float],
+    triggered: list[int],
+    now: datetime,
+) -> None:
+    """Batched executemany UPDATEs: one row per priced pair, one per fired tracker."""
+    await session.execute(
+        update(PricePair.__table__)
+        .where(PricePair.id == bindparam("b_id"))
+        .values(last_price=bindparam("b_price"), last_checked_at=bindparam("b_now")),
+        [{"b_id": pid, "b_price": price, "b_now": now} for pid, price in pair_prices.items()],
+    )
+    if triggered:
+        await session.execute(
+            update(Tracker.__table__)
+            .where(Tracker.id == bindparam("b_id"))
+            .values(last_triggered_at=bindparam("b_now")),
+            [{"b_id": tid, "b_now": now} for tid in triggered],
+        )
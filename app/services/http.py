@@ -0,0 +1,24 @@
+from __future__ import annotations
+import aiohttp
+from app.config import settings
+
+USER_AGENT = "price-tracker-bot/1.0"
+
+
+def create_http_session() -> aiohttp.ClientSession:
+    """
+    One pooled session for the whole process: keep-alive connections,
+    per-host limits and cached DNS lookups shared by the checker and handlers.
+    Must be created inside the running event loop and closed on shutdown.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=settings.HTTP_POOL_LIMIT,
+        limit_per_host=settings.HTTP_POOL_LIMIT_PER_HOST,
+        ttl_dns_cache=settings.HTTP_DNS_CACHE_SECONDS,
+        keepalive_timeout=settings.HTTP_KEEPALIVE_SECONDS,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers={"User-Agent": USER_AGENT},
+        timeout=aiohttp.ClientTimeout(total=settings.HTTP_TIMEOUT_SECONDS),
+    )
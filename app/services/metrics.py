@@ -0,0 +1,116 @@
+from __future__ import annotations
+import logging
+import time
+from typing import Any, Awaitable, Callable
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+from aiohttp import web
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.services.timing import PhaseTimer
+
+log = logging.getLogger(__name__)
+
+# Tick phases run from milliseconds to well past a 60s interval.
+_TICK_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 45, 60, 90, 120, 300)
+
+TICK_SECONDS = Histogram("price_check_tick_seconds", "Wall time of one price check tick", buckets=_TICK_BUCKETS)
+TICK_PHASE_SECONDS = Histogram(
+    "price_check_phase_seconds", "Wall time of one tick phase", ["phase"], buckets=_TICK_BUCKETS
+)
+TICK_INTERVAL_SECONDS = Gauge("price_check_interval_seconds", "Configured interval between ticks")
+TICK_FAILURES = Counter("price_check_failures_total", "Ticks that raised")
+PIPELINE_QUEUE_DEPTH = Gauge("checker_queue_depth", "Batches waiting for a checker pipeline stage", ["stage"])
+
+PROVIDER_REQUEST_SECONDS = Histogram(
+    "price_provider_request_seconds", "Latency of one upstream price request", ["provider"]
+)
+PROVIDER_REQUESTS = Counter(
+    "price_provider_requests_total", "Upstream price requests by outcome", ["provider", "status"]
+)
+
+TRACKERS_EVALUATED = Counter("trackers_evaluated_total", "Trackers checked against a new price")
+ALERTS_FIRED = Counter("alerts_fired_total", "Trackers whose target was crossed")
+ALERTS_SENT = Counter("alerts_sent_total", "Alert messages delivered to Telegram")
+ALERTS_FAILED = Counter("alerts_failed_total", "Alert messages given up on", ["error"])
+ALERTS_QUEUED = Gauge("alerts_queue_depth", "Alert messages waiting for delivery")
+
+DB_QUERY_SECONDS = Histogram("db_query_seconds", "Database statement execution time", ["operation"])
+
+HANDLER_SECONDS = Histogram("bot_handler_seconds", "Handler latency per aiogram router", ["router", "event"])
+HANDLER_ERRORS = Counter("bot_handler_errors_total", "Handlers that raised", ["router", "event"])
+
+
+def observe_tick(timer: PhaseTimer, seconds: float) -> None:
+    TICK_SECONDS.observe(seconds)
+    for phase, spent in timer.phases.items():
+        TICK_PHASE_SECONDS.labels(phase).observe(spent)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Times every statement the engine runs, labelled by its SQL verb."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        DB_QUERY_SECONDS.labels(operation).observe(time.perf_counter() - started)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Inner middleware: handler latency labelled by the router that handled the event."""
+
+    def __init__(self, event_name: str) -> None:
+        self.event_name = event_name
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        router = getattr(data.get("event_router"), "name", "unknown")
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.labels(router, self.event_name).inc()
+            raise
+        finally:
+            HANDLER_SECONDS.labels(router, self.event_name).observe(time.perf_counter() - start)
+
+
+async def _metrics(request: web.Request) -> web.Response:
+    return web.Response(body=generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+
+async def start_metrics_server(port: int, host: str = "0.0.0.0") -> web.AppRunner | None:
+    """
+    Serves /metrics in Prometheus text format on the running event loop.
+    If the port is taken (another process on the same host got it first),
+    logs that and returns None: the process runs on without metrics.
+    """
+    app = web.Application()
+    app.router.add_get("/metrics", _metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        log.warning("Metrics disabled: can't listen on %s:%d (%s)", host, port, e.strerror or e)
+        await runner.cleanup()
+        return None
+    log.info("Metrics on http://%s:%d/metrics", host, port)
+    return runner
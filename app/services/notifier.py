@@ -0,0 +1,190 @@
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from app.config import settings
+from app.services.metrics import ALERTS_FAILED, ALERTS_SENT
+from app.services.ratelimit import TokenBucket
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class OutgoingMessage:
+    chat_id: int
+    text: str
+    parse_mode: str | None = "HTML"
+    attempts: int = 0
+    # alert_outbox row the message came from.
+    outbox_id: int | None = None
+
+
+@dataclass(slots=True)
+class DispatcherStats:
+    enqueued: int = 0
+    sent: int = 0
+    failed: int = 0
+    retried: int = 0
+    dropped: int = 0
+    rate_limited: int = 0
+    errors: dict[str, int] = field(default_factory=dict)
+
+
+class AlertDispatcher:
+    """
+    Delivers alert messages from a queue through a pool of sender tasks.
+
+    Sending is throttled by a global token bucket (Telegram's ~30 msg/s per
+    bot) and a per-chat bucket (~1 msg/s per chat). `TelegramRetryAfter`
+    pauses every sender for the period Telegram asks for; other transient
+    errors are retried with backoff.
+
+    `on_result(msg, error)` is called once per message when it has been
+    delivered (error None) or given up on.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        workers: int = 8,
+        rate_per_second: float = 30.0,
+        per_chat_per_second: float = 1.0,
+        max_retries: int = 3,
+        queue_size: int = 100_000,
+        on_result: Callable[[OutgoingMessage, Exception | None], None] | None = None,
+    ) -> None:
+        self.bot = bot
+        self.on_result = on_result
+        self.stats = DispatcherStats()
+        self._workers = workers
+        self._global = TokenBucket(rate_per_second)
+        self._per_chat_rate = per_chat_per_second
+        self._chats: OrderedDict[int, TokenBucket] = OrderedDict()
+        self._max_retries = max_retries
+        self._queue: asyncio.Queue[OutgoingMessage] = asyncio.Queue(maxsize=queue_size)
+        self._paused_until = 0.0
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run(), name=f"alert-sender-{i}") for i in range(self._workers)]
+
+    async def join(self) -> None:
+        """Waits until every queued message has been sent or given up on."""
+        await self._queue.join()
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        try:
+            await asyncio.wait_for(self._queue.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            log.warning("Alert dispatcher stopped with %d undelivered messages", self._queue.qsize())
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(
+        self, chat_id: int, text: str, parse_mode: str | None = "HTML", outbox_id: int | None = None
+    ) -> bool:
+        """Queues a message without waiting; returns False if the queue is full."""
+        try:
+            self._queue.put_nowait(OutgoingMessage(chat_id, text, parse_mode, outbox_id=outbox_id))
+        except asyncio.QueueFull:
+            self.stats.dropped += 1
+            log.error("Alert queue is full, dropping message for chat %s", chat_id)
+            return False
+        self.stats.enqueued += 1
+        return True
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = self._chats[chat_id] = TokenBucket(self._per_chat_rate, 1.0)
+            # Forget chats whose bucket has refilled; they'd start full anyway.
+            while len(self._chats) > 10_000:
+                oldest, b = next(iter(self._chats.items()))
+                if not b.idle():
+                    break
+                del self._chats[oldest]
+        self._chats.move_to_end(chat_id)
+        return bucket
+
+    async def _run(self) -> None:
+        while True:
+            msg = await self._queue.get()
+            try:
+                await self._deliver(msg)
+            except Exception:
+                log.exception("Unexpected error delivering alert to chat %s", msg.chat_id)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, msg: OutgoingMessage) -> None:
+        while True:
+            await self._chat_bucket(msg.chat_id).acquire()
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            await self._global.acquire()
+
+            msg.attempts += 1
+            try:
+                await self.bot.send_message(msg.chat_id, msg.text, parse_mode=msg.parse_mode)
+            except TelegramRetryAfter as e:
+                self.stats.rate_limited += 1
+                self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+                log.warning("Telegram asked to retry after %ss", e.retry_after)
+                # Flood control isn't the message's fault: don't count the attempt.
+                msg.attempts -= 1
+                continue
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                # Blocked bot, deleted chat, bad markup: retrying won't help.
+                self._fail(msg, e)
+                return
+            except Exception as e:
+                if msg.attempts > self._max_retries:
+                    self._fail(msg, e)
+                    return
+                self.stats.retried += 1
+                await asyncio.sleep(min(2 ** msg.attempts, 30))
+                continue
+
+            self.stats.sent += 1
+            ALERTS_SENT.inc()
+            self._report(msg, None)
+            return
+
+    def _fail(self, msg: OutgoingMessage, err: Exception) -> None:
+        self.stats.failed += 1
+        name = type(err).__name__
+        self.stats.errors[name] = self.stats.errors.get(name, 0) + 1
+        ALERTS_FAILED.labels(name).inc()
+        log.warning("Failed to deliver alert to chat %s after %d attempt(s): %r", msg.chat_id, msg.attempts, err)
+        self._report(msg, err)
+
+    def _report(self, msg: OutgoingMessage, err: Exception | None) -> None:
+        if self.on_result is not None:
+            try:
+                self.on_result(msg, err)
+            except Exception:
+                log.exception("Alert result callback failed")
+
+
+def create_notifier(bot: Bot) -> AlertDispatcher:
+    return AlertDispatcher(
+        bot,
+        workers=settings.NOTIFY_WORKERS,
+        rate_per_second=settings.NOTIFY_RATE_PER_SECOND,
+        per_chat_per_second=settings.NOTIFY_PER_CHAT_PER_SECOND,
+        max_retries=settings.NOTIFY_MAX_RETRIES,
+        queue_size=settings.NOTIFY_QUEUE_SIZE,
+    )
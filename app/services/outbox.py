@@ -0,0 +1,261 @@
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Any
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from sqlalchemy import case, delete, func, insert, select, text, update
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+from app.config import settings
+from app.db.listen import listen, unlisten
+from app.db.models import AlertOutbox
+from app.db.session import SessionLocal
+from app.services.notifier import AlertDispatcher, OutgoingMessage
+
+log = logging.getLogger(__name__)
+
+# NOTIFY channel that wakes senders when new rows are committed.
+CHANNEL = "alert_outbox"
+
+
+async def enqueue_alerts(session: AsyncSession, messages: list[tuple[int, str]]) -> None:
+    """
+    Adds (chat_id, text) messages to the outbox in the caller's transaction;
+    senders are woken when it commits.
+    """
+    if not messages:
+        return
+    await session.execute(
+        insert(AlertOutbox),
+        [{"chat_id": chat_id, "text": txt, "parse_mode": "HTML"} for chat_id, txt in messages],
+    )
+    await session.execute(text(f"NOTIFY {CHANNEL}"))
+
+
+class OutboxSender:
+    """
+    Drains `alert_outbox` through an AlertDispatcher.
+
+    Rows are claimed in chunks with `FOR UPDATE SKIP LOCKED`, and claiming
+    moves their `available_at` a lease ahead in the same short transaction,
+    so any number of senders can run side by side without sending a row
+    twice while it's in flight. Delivered rows are deleted in batches.
+    A sender that dies before acknowledging leaves its rows to come back
+    after the lease: delivery is at least once.
+
+    Leases of rows still waiting in the dispatcher (behind a RetryAfter, a
+    backoff or a per-chat rate limit) are renewed every third of a lease,
+    so a live sender doesn't lose them to another one. A row claimed again
+    while already queued here is not queued twice.
+    """
+
+    def __init__(
+        self,
+        dispatcher: AlertDispatcher,
+        engine: AsyncEngine,
+        batch_size: int = 100,
+        lease_seconds: float = 60.0,
+        poll_seconds: float = 5.0,
+        max_attempts: int = 10,
+        flush_seconds: float = 1.0,
+    ) -> None:
+        self.dispatcher = dispatcher
+        self.engine = engine
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.flush_seconds = flush_seconds
+        self._sent: list[int] = []
+        self._failed: dict[int, str] = {}
+        self._retry: dict[int, str] = {}
+        # Outbox ids handed to the dispatcher and not finished yet.
+        self._in_flight: set[int] = set()
+        self._renewed_at = time.monotonic()
+        self._wakeup = asyncio.Event()
+        self._listener: AsyncConnection | None = None
+        self._listener_lost = False
+        self._task: asyncio.Task | None = None
+        dispatcher.on_result = self._on_result
+
+    def _on_result(self, msg: OutgoingMessage, err: Exception | None) -> None:
+        if msg.outbox_id is None:
+            return
+        self._in_flight.discard(msg.outbox_id)
+        if err is None:
+            self._sent.append(msg.outbox_id)
+        elif isinstance(err, (TelegramForbiddenError, TelegramBadRequest)):
+            self._failed[msg.outbox_id] = type(err).__name__
+        else:
+            self._retry[msg.outbox_id] = type(err).__name__
+
+    def _lost(self) -> None:
+        self._listener_lost = True
+        self._wakeup.set()
+
+    async def _listen(self) -> None:
+        """LISTEN on a dedicated connection; without it the sender just polls."""
+        if self._listener is not None and not self._listener_lost:
+            return
+        await self._close_listener()
+        self._listener_lost = False
+        try:
+            self._listener = await listen(self.engine, CHANNEL, lambda _: self._wakeup.set(), self._lost)
+        except Exception:
+            log.warning("Could not LISTEN on %s; polling every %ss", CHANNEL, self.poll_seconds, exc_info=True)
+
+    async def claim(self) -> list[Any]:
+        """Leases up to `batch_size` deliverable rows, oldest first."""
+        pending = (
+            select(AlertOutbox.id)
+            .where(AlertOutbox.failed_at.is_(None), AlertOutbox.available_at <= func.now())
+            .order_by(AlertOutbox.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        async with SessionLocal() as session:
+            res = await session.execute(
+                update(AlertOutbox)
+                .where(AlertOutbox.id.in_(pending))
+                .values(
+                    available_at=func.now() + timedelta(seconds=self.lease_seconds),
+                    attempts=AlertOutbox.attempts + 1,
+                )
+                .returning(AlertOutbox.id, AlertOutbox.chat_id, AlertOutbox.text, AlertOutbox.parse_mode)
+            )
+            rows = sorted(res.all(), key=lambda r: r.id)
+            await session.commit()
+        return rows
+
+    async def send_batch(self) -> int:
+        """Claims a chunk and hands it to the dispatcher; returns its size."""
+        rows = await self.claim()
+        for r in rows:
+            if r.id in self._in_flight:
+                continue
+            self._in_flight.add(r.id)
+            if not self.dispatcher.submit(r.chat_id, r.text, r.parse_mode, outbox_id=r.id):
+                # Queue full: the lease runs out and the row comes back.
+                self._in_flight.discard(r.id)
+        return len(rows)
+
+    async def renew(self) -> None:
+        """Pushes the leases of the rows still in flight a full lease ahead."""
+        self._renewed_at = time.monotonic()
+        ids = sorted(self._in_flight)
+        if not ids:
+            return
+        try:
+            async with SessionLocal() as session:
+                await session.execute(
+                    update(AlertOutbox)
+                    .where(AlertOutbox.id.in_(ids), AlertOutbox.failed_at.is_(None))
+                    .values(available_at=func.now() + timedelta(seconds=self.lease_seconds))
+                )
+                await session.commit()
+        except Exception:
+            log.exception("Failed to renew the leases of %d queued alert(s)", len(ids))
+
+    async def flush(self) -> None:
+        """Writes back the outcome of the messages finished since the last flush."""
+        sent, self._sent = self._sent, []
+        failed, self._failed = self._failed, {}
+        retry, self._retry = self._retry, {}
+        if not (sent or failed or retry):
+            return
+        try:
+            async with SessionLocal() as session:
+                if sent:
+                    await session.execute(delete(AlertOutbox).where(AlertOutbox.id.in_(sent)))
+                for ids, error, permanent in _by_error(failed, True) + _by_error(retry, False):
+                    if permanent:
+                        values = {"failed_at": func.now(), "last_error": error}
+                    else:
+                        # Back off: 2, 4, ... minutes, capped at an hour; give
+                        # up after max_attempts.
+                        backoff = func.least(func.power(2, AlertOutbox.attempts) * 60, 3600)
+                        values = {
+                            "available_at": func.now() + func.make_interval(0, 0, 0, 0, 0, 0, backoff),
+                            "last_error": error,
+                            "failed_at": case((AlertOutbox.attempts >= self.max_attempts, func.now())),
+                        }
+                    await session.execute(update(AlertOutbox).where(AlertOutbox.id.in_(ids)).values(**values))
+                await session.commit()
+        except Exception:
+            n = len(sent) + len(failed) + len(retry)
+            log.exception("Failed to record %d alert outcome(s); they'll be sent again", n)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            await self.flush()
+            if time.monotonic() - self._renewed_at >= self.lease_seconds / 3:
+                await self.renew()
+
+    async def run(self) -> None:
+        flush_task = asyncio.create_task(self._flush_loop())
+        try:
+            while True:
+                await self._listen()
+                # Claim only while the dispatcher keeps up, so rows aren't
+                # leased long before they can be sent.
+                if len(self._in_flight) < self.batch_size:
+                    self._wakeup.clear()
+                    try:
+                        claimed = await self.send_batch()
+                    except Exception:
+                        log.exception("Failed to claim outbox rows")
+                        claimed = 0
+                    if claimed == self.batch_size:
+                        continue
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    await asyncio.sleep(0.1)
+        finally:
+            flush_task.cancel()
+            await asyncio.gather(flush_task, return_exceptions=True)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(), name="outbox-sender")
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        """Stops claiming, waits for messages in flight and records their outcome."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await asyncio.wait_for(self.dispatcher.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            pass
+        await self.flush()
+        await self._close_listener()
+
+    async def _close_listener(self) -> None:
+        conn, self._listener = self._listener, None
+        if conn is not None:
+            await unlisten(conn)
+
+
+def _by_error(outcomes: dict[int, str], permanent: bool) -> list[tuple[list[int], str, bool]]:
+    groups: dict[str, list[int]] = {}
+    for oid, error in outcomes.items():
+        groups.setdefault(error, []).append(oid)
+    return [(ids, error, permanent) for error, ids in groups.items()]
+
+
+def create_outbox_sender(dispatcher: AlertDispatcher, engine: AsyncEngine) -> OutboxSender:
+    return OutboxSender(
+        dispatcher,
+        engine,
+        batch_size=settings.OUTBOX_BATCH_SIZE,
+        lease_seconds=settings.OUTBOX_LEASE_SECONDS,
+        poll_seconds=settings.OUTBOX_POLL_SECONDS,
+        max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+    )
@@ -0,0 +1,110 @@
+from __future__ import annotations
+import logging
+import math
+import random
+from typing import Awaitable, Callable
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+log = logging.getLogger(__name__)
+
+# First key of the two-int advisory locks, so ours can't collide with anyone else's.
+MEMBERS_NS = 0x50544201
+PARTITIONS_NS = 0x50544202
+
+
+class PartitionLeaser:
+    """
+    Splits price pairs into `total` partitions (pair id modulo `total`) and
+    owns a fair share of them through Postgres session-level advisory locks.
+
+    Locks live on one dedicated connection: when a worker dies its connection
+    closes, the locks are released, and the remaining workers pick the
+    partitions up on their next `rebalance()`. A partition is only ever held
+    by one session, so two workers never evaluate the same pair.
+
+    A live worker gives a partition up only after `before_release` says its
+    work on it is stored: the next owner starts from the committed prices
+    and can't fire a crossing the previous one already alerted on.
+    """
+
+    def __init__(self, engine: AsyncEngine, total: int) -> None:
+        self.engine = engine
+        self.total = total
+        self.owned: set[int] = set()
+        self._conn: AsyncConnection | None = None
+        self._member_key = random.randint(1, 2**31 - 1)
+
+    async def _connect(self) -> AsyncConnection:
+        if self._conn is None:
+            conn = await self.engine.connect()
+            # Autocommit: lock calls must not sit inside an open transaction.
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(
+                text("SELECT pg_advisory_lock(:ns, :key)"), {"ns": MEMBERS_NS, "key": self._member_key}
+            )
+            self._conn = conn
+            self.owned = set()
+        return self._conn
+
+    async def _members(self, conn: AsyncConnection) -> int:
+        res = await conn.execute(
+            text(
+                "SELECT count(*) FROM pg_locks "
+                "WHERE locktype = 'advisory' AND classid = :ns AND objsubid = 2 AND granted"
+            ),
+            {"ns": MEMBERS_NS},
+        )
+        return max(int(res.scalar_one()), 1)
+
+    async def rebalance(self, before_release: Callable[[set[int]], Awaitable[None]] | None = None) -> set[int]:
+        """
+        Releases partitions above the fair share and claims free ones up to
+        it. `before_release(partitions)` runs before anything is released
+        and must return only once nothing on them is left uncommitted; if it
+        raises, the partitions are kept until the next rebalance.
+        """
+        try:
+            conn = await self._connect()
+            share = math.ceil(self.total / await self._members(conn))
+
+            surplus = sorted(self.owned)[share:]
+            if surplus and before_release is not None:
+                try:
+                    await before_release(set(surplus))
+                except Exception:
+                    log.warning("Keeping partitions %s until their work is stored", surplus, exc_info=True)
+                    surplus = []
+            for p in surplus:
+                await conn.execute(
+                    text("SELECT pg_advisory_unlock(:ns, :p)"), {"ns": PARTITIONS_NS, "p": p}
+                )
+                self.owned.discard(p)
+
+            candidates = [p for p in range(self.total) if p not in self.owned]
+            random.shuffle(candidates)
+            for p in candidates:
+                if len(self.owned) >= share:
+                    break
+                got = await conn.execute(
+                    text("SELECT pg_try_advisory_lock(:ns, :p)"), {"ns": PARTITIONS_NS, "p": p}
+                )
+                if got.scalar_one():
+                    self.owned.add(p)
+        except Exception:
+            # The lock connection is gone, and with it every lock we held.
+            log.exception("Partition rebalance failed; dropping all partitions")
+            await self.close()
+        return set(self.owned)
+
+    async def close(self) -> None:
+        conn, self._conn = self._conn, None
+        self.owned = set()
+        if conn is not None:
+            try:
+                # Session locks outlive a return to the pool; only ending
+                # the session releases them.
+                await conn.invalidate()
+                await conn.close()
+            except Exception:
+                pass
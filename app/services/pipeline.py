@@ -0,0 +1,188 @@
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Collection
+from app.db.session import SessionLocal
+from app.services.checker import store_prices
+from app.services.metrics import PIPELINE_QUEUE_DEPTH, TICK_FAILURES, TICK_PHASE_SECONDS, TICK_SECONDS
+from app.services.prices.cache import PriceCache
+from app.services.prices.fetch import fetch_prices
+from app.services.prices.registry import PriceRouter
+from app.services.timing import PhaseTimer
+from app.services.tracker_snapshot import TrackerSnapshot
+from app.services.tracker_table import TrackerView
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class PriceBatch:
+    """Prices from one fetch (or several merged while evaluation lagged)."""
+
+    pair_prices: dict[int, float]
+    started: float
+    merged: int = 1
+
+
+@dataclass(slots=True)
+class Evaluated:
+    pair_prices: dict[int, float]
+    fired: list[tuple[TrackerView, float]]
+    checked_at: datetime
+    started: float
+    timer: PhaseTimer = field(default_factory=PhaseTimer)
+
+
+def _merge(older: PriceBatch, newer: PriceBatch) -> PriceBatch:
+    return PriceBatch({**older.pair_prices, **newer.pair_prices}, older.started, older.merged + newer.merged)
+
+
+class CheckerPipeline:
+    """
+    The price check as three stages joined by bounded queues:
+
+        fetch -> evaluate -> persist
+
+    Delivery is a fourth stage of its own: persisting writes the alerts to
+    the outbox that the OutboxSender drains.
+
+    `fetch()` runs on the scheduler's interval and never waits on the rest:
+    when evaluation falls behind, the batches still waiting for it are
+    merged with the new one. Later stages block on a full queue, which
+    slows the stage before them rather than growing memory.
+
+    Pairs and trackers come from a resident TrackerSnapshot, so the only
+    database access per tick is the commit. Evaluation can run ahead of
+    persisting, so it remembers the prices it evaluated until they are
+    committed and uses them instead of the stored ones; a tracker never
+    fires twice for one crossing.
+    """
+
+    def __init__(
+        self,
+        router: PriceRouter,
+        price_cache: PriceCache,
+        snapshot: TrackerSnapshot,
+        evaluate_queue: int = 2,
+        persist_queue: int = 4,
+    ) -> None:
+        self.router = router
+        self.price_cache = price_cache
+        self.snapshot = snapshot
+        self._evaluate_q: asyncio.Queue[PriceBatch] = asyncio.Queue(evaluate_queue)
+        self._persist_q: asyncio.Queue[Evaluated] = asyncio.Queue(persist_queue)
+        # pair_id -> (price, checked_at) evaluated but not committed yet.
+        self._unsaved: dict[int, tuple[float, datetime]] = {}
+        self._tasks: list[asyncio.Task] = []
+        for stage, q in self._queues().items():
+            PIPELINE_QUEUE_DEPTH.labels(stage).set_function(q.qsize)
+
+    def _queues(self) -> dict[str, asyncio.Queue[Any]]:
+        return {"evaluate": self._evaluate_q, "persist": self._persist_q}
+
+    def queue_depths(self) -> dict[str, int]:
+        return {stage: q.qsize() for stage, q in self._queues().items()}
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._evaluate_loop(), name="checker-evaluate"),
+                asyncio.create_task(self._persist_loop(), name="checker-persist"),
+            ]
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        try:
+            for q in self._queues().values():
+                await asyncio.wait_for(q.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            log.warning("Checker pipeline stopped with queued work: %s", self.queue_depths())
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def drain(self) -> None:
+        """Waits until every batch fetched so far is evaluated and stored (or dropped)."""
+        for q in self._queues().values():
+            await q.join()
+
+    async def fetch(self, partitions: Collection[int] | None = None) -> None:
+        """Fetch stage: current prices of every active pair (in `partitions`)."""
+        started = time.perf_counter()
+        timer = PhaseTimer()
+        keys = self.snapshot.active_pairs(partitions)
+        if not keys:
+            return
+        with timer.phase("fetch"):
+            prices = await fetch_prices(set(keys.values()), self.router, self.price_cache)
+        _observe(timer)
+
+        pair_prices = {pid: prices[key] for pid, key in keys.items() if key in prices}
+        if not pair_prices:
+            return
+        batch = PriceBatch(pair_prices, started)
+        if self._evaluate_q.full():
+            # Evaluation is behind: fold everything still waiting and this
+            # tick into one batch (newest price wins) instead of waiting.
+            waiting = []
+            while not self._evaluate_q.empty():
+                waiting.append(self._evaluate_q.get_nowait())
+                self._evaluate_q.task_done()
+            for older in reversed(waiting):
+                batch = _merge(older, batch)
+            log.warning("Evaluation is behind; merged %d fetches into one batch", batch.merged)
+        self._evaluate_q.put_nowait(batch)
+        log.debug("Checker queues: %s", self.queue_depths())
+
+    async def _evaluate_loop(self) -> None:
+        while True:
+            batch = await self._evaluate_q.get()
+            try:
+                item = await self._evaluate(batch)
+                await self._persist_q.put(item)
+            except Exception:
+                TICK_FAILURES.inc()
+                log.exception("Failed to evaluate %d pair(s)", len(batch.pair_prices))
+            finally:
+                self._evaluate_q.task_done()
+
+    async def _evaluate(self, batch: PriceBatch) -> Evaluated:
+        timer = PhaseTimer()
+        now = self.snapshot.now()
+        with timer.phase("evaluate"):
+            fired = self.snapshot.find_fired(batch.pair_prices, now, self._unsaved)
+        for pid, price in batch.pair_prices.items():
+            self._unsaved[pid] = (price, now)
+        return Evaluated(batch.pair_prices, fired, now, batch.started, timer)
+
+    async def _persist_loop(self) -> None:
+        while True:
+            item = await self._persist_q.get()
+            try:
+                with item.timer.phase("commit"):
+                    async with SessionLocal() as session:
+                        await store_prices(session, item.pair_prices, item.fired, item.checked_at)
+                self.snapshot.stored(item.pair_prices, item.checked_at)
+                _observe(item.timer)
+                TICK_SECONDS.observe(time.perf_counter() - item.started)
+            except Exception:
+                TICK_FAILURES.inc()
+                log.exception("Failed to store %d pair price(s)", len(item.pair_prices))
+            finally:
+                # Whether stored or not, the next evaluation starts from the stored state.
+                self._forget(item)
+                self._persist_q.task_done()
+
+    def _forget(self, item: Evaluated) -> None:
+        for pid in item.pair_prices:
+            state = self._unsaved.get(pid)
+            if state is not None and state[1] == item.checked_at:
+                del self._unsaved[pid]
+
+
+def _observe(timer: PhaseTimer) -> None:
+    for phase, spent in timer.phases.items():
+        TICK_PHASE_SECONDS.labels(phase).observe(spent)
@@ -0,0 +1,87 @@
+from __future__ import annotations
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Iterable, Mapping
+
+# Worst case length of "," after percent-encoding.
+_SEP_LEN = 3
+
+
+@dataclass(frozen=True)
+class SimplePriceBatch:
+    ids: tuple[str, ...]
+    vs_currencies: tuple[str, ...]
+
+
+def _joined_len(items: Iterable[str]) -> int:
+    items = list(items)
+    return sum(len(i) for i in items) + _SEP_LEN * max(len(items) - 1, 0)
+
+
+def _chunk_by_length(items: list[str], budget: int, max_items: int | None = None) -> list[list[str]]:
+    """Greedy chunks whose joined length fits `budget` and, if given, hold at most `max_items`."""
+    chunks: list[list[str]] = []
+    cur: list[str] = []
+    cur_len = 0
+    for item in items:
+        extra = len(item) + (_SEP_LEN if cur else 0)
+        if cur and (cur_len + extra > budget or len(cur) == max_items):
+            chunks.append(cur)
+            cur, cur_len = [], 0
+            extra = len(item)
+        cur.append(item)
+        cur_len += extra
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+
+def plan_simple_price_batches(
+    demand: Mapping[str, Iterable[str]],
+    base_url_length: int,
+    max_url_length: int = 4096,
+    max_ids: int = 250,
+) -> list[SimplePriceBatch]:
+    """
+    Packs (coin_id -> quotes) demand into as few /simple/price calls as possible.
+
+    One call returns every id in every vs_currency, so quotes are merged into
+    shared calls and ids are packed greedily until the URL or id limit is hit.
+    `base_url_length` is the length of the endpoint URL without the query.
+    """
+    wanted: dict[str, set[str]] = {}
+    for coin_id, quotes in demand.items():
+        cid = coin_id.strip().lower()
+        qs = {q.strip().lower() for q in quotes if q and q.strip()}
+        if cid and qs:
+            wanted.setdefault(cid, set()).update(qs)
+    if not wanted:
+        return []
+
+    fixed = base_url_length + len("?ids=&vs_currencies=")
+    budget = max_url_length - fixed
+    if budget <= 0:
+        raise ValueError("max_url_length is too small for the endpoint URL")
+
+    # Normally all quotes fit in one vs_currencies list; otherwise split them
+    # so at least half of the URL stays available for ids.
+    all_quotes = sorted({q for qs in wanted.values() for q in qs})
+    quote_groups = _chunk_by_length(all_quotes, budget // 2)
+
+    batches: list[SimplePriceBatch] = []
+    for group in quote_groups:
+        group_set = set(group)
+        coins = sorted(c for c, qs in wanted.items() if qs & group_set)
+        # Coins demanding the same quotes go together so each call asks only
+        # for the vs_currencies its ids need.
+        by_quotes: dict[tuple[str, ...], list[str]] = defaultdict(list)
+        for c in coins:
+            by_quotes[tuple(sorted(wanted[c] & group_set))].append(c)
+
+        vs = tuple(sorted({q for qs in by_quotes for q in qs}))
+        ids_budget = budget - _joined_len(vs)
+        ordered = [c for qs in sorted(by_quotes) for c in by_quotes[qs]]
+        for chunk in _chunk_by_length(ordered, ids_budget, max_ids):
+            chunk_vs = tuple(sorted({q for c in chunk for q in wanted[c] & group_set}))
+            batches.append(SimplePriceBatch(ids=tuple(chunk), vs_currencies=chunk_vs))
+    return batches
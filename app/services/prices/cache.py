@@ -0,0 +1,153 @@
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+from app.config import settings
+
+log = logging.getLogger(__name__)
+
+COINGECKO = "coingecko"
+FRANKFURTER = "frankfurter"
+
+# (provider, coin_id or base, quote)
+PriceKey = tuple[str, str, str]
+Fetcher = Callable[[], Awaitable["float | None"]]
+# (key, max age) -> (price, age) of a price stored elsewhere, e.g. by another process.
+StoredLookup = Callable[[PriceKey, float], Awaitable["tuple[float, float] | None"]]
+
+
+@dataclass(slots=True)
+class _Entry:
+    value: float
+    stored_at: float
+
+
+class PriceCache:
+    """
+    In-process LRU cache of last known prices.
+
+    An entry younger than its provider TTL is fresh. Past the TTL it is still
+    served for `stale_seconds` while a single background refresh runs; after
+    that the caller waits for a fetch.
+
+    With `stored`, a miss first asks it for a price younger than the TTL
+    (what the checkers stored in the database) and fetches only without one.
+    """
+
+    def __init__(
+        self,
+        ttls: dict[str, float],
+        default_ttl: float = 60.0,
+        stale_seconds: float = 0.0,
+        max_size: int = 10_000,
+        stored: StoredLookup | None = None,
+    ) -> None:
+        self._ttls = dict(ttls)
+        self._default_ttl = default_ttl
+        self._stale_seconds = stale_seconds
+        self._max_size = max_size
+        self._stored = stored
+        self._entries: OrderedDict[PriceKey, _Entry] = OrderedDict()
+        self._inflight: dict[PriceKey, asyncio.Future] = {}
+        self._background: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _ttl(self, key: PriceKey) -> float:
+        return self._ttls.get(key[0], self._default_ttl)
+
+    def set(self, key: PriceKey, value: float, age: float = 0.0) -> None:
+        self._entries[key] = _Entry(float(value), time.monotonic() - age)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def get(self, key: PriceKey) -> float | None:
+        """Fresh value or None; never triggers a fetch."""
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry.stored_at > self._ttl(key):
+            return None
+        self._entries.move_to_end(key)
+        return entry.value
+
+    async def get_or_fetch(self, key: PriceKey, fetch: Fetcher) -> float | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.stored_at
+            ttl = self._ttl(key)
+            if age <= ttl:
+                self._entries.move_to_end(key)
+                return entry.value
+            if age <= ttl + self._stale_seconds:
+                self._entries.move_to_end(key)
+                self._revalidate(key, fetch)
+                return entry.value
+        return await self._fetch(key, fetch)
+
+    async def _fetch(self, key: PriceKey, fetch: Fetcher) -> float | None:
+        # Concurrent misses for the same key share one upstream request.
+        fut = self._inflight.get(key)
+        if fut is not None:
+            return await asyncio.shield(fut)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            value = await self._lookup(key)
+            if value is None:
+                value = await fetch()
+                if value is not None:
+                    self.set(key, value)
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved when nobody else is waiting
+            raise
+        else:
+            fut.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _lookup(self, key: PriceKey) -> float | None:
+        if self._stored is None:
+            return None
+        try:
+            found = await self._stored(key, self._ttl(key))
+        except Exception:
+            log.warning("Stored price lookup failed for %s", key, exc_info=True)
+            return None
+        if found is None:
+            return None
+        value, age = found
+        self.set(key, value, age)
+        return value
+
+    def _revalidate(self, key: PriceKey, fetch: Fetcher) -> None:
+        if key in self._inflight:
+            return
+
+        async def run() -> None:
+            try:
+                await self._fetch(key, fetch)
+            except Exception:
+                log.warning("Background refresh failed for %s", key, exc_info=True)
+
+        task = asyncio.create_task(run())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+
+def create_price_cache(stored: StoredLookup | None = None) -> PriceCache:
+    return PriceCache(
+        ttls={COINGECKO: settings.PRICE_CACHE_TTL_CRYPTO, FRANKFURTER: settings.PRICE_CACHE_TTL_FX},
+        stale_seconds=settings.PRICE_CACHE_STALE_SECONDS,
+        max_size=settings.PRICE_CACHE_MAX_SIZE,
+        stored=stored,
+    )
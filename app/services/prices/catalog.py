@@ -0,0 +1,132 @@
+from __future__ import annotations
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+import aiohttp
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from app.config import settings
+from app.db.models import Coin
+from app.db.session import SessionLocal
+from .coin_index import CoinIndex
+from .coingecko import CoinGeckoClient
+from .types import CoinSearchResult
+
+log = logging.getLogger(__name__)
+
+
+class CoinCatalog:
+    """
+    Coin search served from a local copy of CoinGecko's coin list.
+
+    The list (plus market cap ranks for the top coins) is stored in the
+    `coins` table and re-downloaded every `refresh_seconds`; searches never
+    leave the process. Only while the catalog is still empty do they fall
+    back to CoinGecko's /search.
+    """
+
+    def __init__(
+        self,
+        http: aiohttp.ClientSession,
+        refresh_seconds: float = 24 * 3600,
+        ranked_pages: int = 4,
+        retry_seconds: float = 600.0,
+    ) -> None:
+        self.client = CoinGeckoClient(http)
+        self.refresh_seconds = refresh_seconds
+        self.ranked_pages = ranked_pages
+        self.retry_seconds = retry_seconds
+        self.index = CoinIndex(())
+        self.updated_at: datetime | None = None
+
+    async def search(self, query: str, limit: int = 5) -> list[CoinSearchResult]:
+        if self.index:
+            return self.index.search(query, limit)
+        return await self.client.search(query, limit)
+
+    async def load(self) -> None:
+        """Builds the index from the stored catalog."""
+        async with SessionLocal() as session:
+            rows = (await session.execute(select(Coin))).scalars().all()
+        if rows:
+            self.index = CoinIndex(
+                CoinSearchResult(id=c.id, name=c.name, symbol=c.symbol, market_cap_rank=c.market_cap_rank)
+                for c in rows
+            )
+            self.updated_at = max(c.updated_at for c in rows)
+
+    async def refresh(self) -> None:
+        """Downloads the catalog, stores it and swaps in a new index."""
+        coins = await self.client.coins_list()
+        ranks: dict[str, int] = {}
+        for page in range(1, self.ranked_pages + 1):
+            for row in await self.client.coins_markets(page):
+                if row.get("market_cap_rank"):
+                    ranks[row["id"]] = int(row["market_cap_rank"])
+
+        now = datetime.now(timezone.utc)
+        rows = [
+            {
+                "id": str(c["id"])[:128],
+                "symbol": str(c.get("symbol") or "")[:64],
+                "name": str(c.get("name") or "")[:256],
+                "market_cap_rank": ranks.get(c["id"]),
+                "updated_at": now,
+            }
+            for c in coins
+            if c.get("id")
+        ]
+        if not rows:
+            raise RuntimeError("CoinGecko returned an empty coin list")
+
+        async with SessionLocal() as session:
+            stmt = insert(Coin)
+            await session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[Coin.id],
+                    set_={
+                        "symbol": stmt.excluded.symbol,
+                        "name": stmt.excluded.name,
+                        "market_cap_rank": stmt.excluded.market_cap_rank,
+                        "updated_at": stmt.excluded.updated_at,
+                    },
+                ),
+                rows,
+            )
+            # Delisted coins.
+            await session.execute(delete(Coin).where(Coin.updated_at < now))
+            await session.commit()
+
+        self.index = CoinIndex(
+            CoinSearchResult(id=r["id"], name=r["name"], symbol=r["symbol"], market_cap_rank=r["market_cap_rank"])
+            for r in rows
+        )
+        self.updated_at = now
+        log.info("Coin catalog refreshed: %d coins, %d ranked", len(rows), len(ranks))
+
+    async def _stored_at(self) -> datetime | None:
+        async with SessionLocal() as session:
+            return (await session.execute(select(func.max(Coin.updated_at)))).scalar_one()
+
+    async def run(self) -> None:
+        """Keeps the catalog fresh; meant to run as a background task."""
+        while True:
+            try:
+                # Another process may have refreshed the table in the meantime.
+                stored_at = await self._stored_at()
+                if stored_at is not None and (self.updated_at is None or stored_at > self.updated_at):
+                    await self.load()
+                due = self.updated_at + timedelta(seconds=self.refresh_seconds) if self.updated_at else None
+                if due is None or due <= datetime.now(timezone.utc):
+                    await self.refresh()
+            except Exception:
+                log.exception("Coin catalog refresh failed")
+            await asyncio.sleep(self.retry_seconds)
+
+
+def create_coin_catalog(http: aiohttp.ClientSession) -> CoinCatalog:
+    return CoinCatalog(
+        http,
+        refresh_seconds=settings.COIN_CATALOG_REFRESH_HOURS * 3600,
+        ranked_pages=settings.COIN_CATALOG_RANKED_PAGES,
+    )
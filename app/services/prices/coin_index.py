@@ -0,0 +1,114 @@
+from __future__ import annotations
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import Iterable
+from .types import CoinSearchResult
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _trigrams(s: str) -> set[str]:
+    """pg_trgm-style trigrams: each word padded with two spaces in front, one behind."""
+    out: set[str] = set()
+    for w in _WORD.findall(s):
+        w = f"  {w} "
+        out.update(w[k:k + 3] for k in range(len(w) - 2))
+    return out
+
+
+def _popularity(c: CoinSearchResult) -> tuple:
+    return (c.market_cap_rank is None, c.market_cap_rank or 0, len(c.name))
+
+
+class CoinIndex:
+    """
+    Immutable in-memory coin search. Coins are numbered in popularity order
+    (market cap rank, unranked last), so every posting list below is already
+    sorted best-first and merging them keeps that order.
+
+    Matches, best first: exact symbol/id/name, word prefix, trigram
+    similarity of the name.
+    """
+
+    SHORT_PREFIX = 3
+    SHORT_PREFIX_KEEP = 50
+    MIN_SIMILARITY = 0.3
+
+    def __init__(self, coins: Iterable[CoinSearchResult]) -> None:
+        self.coins = sorted(coins, key=_popularity)
+        self._exact: dict[str, list[int]] = defaultdict(list)
+        self._short: dict[str, list[int]] = defaultdict(list)
+        self._grams: dict[str, list[int]] = defaultdict(list)
+        self._gram_count: list[int] = []
+        tokens: list[tuple[str, int]] = []
+
+        for i, c in enumerate(self.coins):
+            symbol, coin_id, name = c.symbol.lower(), c.id.lower(), c.name.lower()
+            for key in {symbol, coin_id, name}:
+                self._exact[key].append(i)
+
+            words = {symbol, coin_id, name, *_WORD.findall(name), *_WORD.findall(coin_id)}
+            tokens.extend((w, i) for w in words)
+            # Short prefixes match too many tokens to scan per query: keep
+            # their most popular coins instead.
+            for p in {w[:n] for w in words for n in range(1, self.SHORT_PREFIX + 1)}:
+                posting = self._short[p]
+                if len(posting) < self.SHORT_PREFIX_KEEP:
+                    posting.append(i)
+
+            # Symbols are short enough for exact/prefix matching to cover.
+            grams = _trigrams(name)
+            for g in grams:
+                self._grams[g].append(i)
+            self._gram_count.append(len(grams))
+
+        tokens.sort()
+        self._tokens = tokens
+        self._keys = [w for w, _ in tokens]
+
+    def __len__(self) -> int:
+        return len(self.coins)
+
+    def _prefix(self, q: str) -> list[int]:
+        if len(q) <= self.SHORT_PREFIX:
+            return self._short.get(q, [])
+        lo = bisect_left(self._keys, q)
+        hi = bisect_left(self._keys, q + "\uffff", lo)
+        return sorted({i for _, i in self._tokens[lo:hi]})
+
+    def _fuzzy(self, q: str) -> list[int]:
+        grams = _trigrams(q)
+        if not grams:
+            return []
+        shared: Counter[int] = Counter()
+        for g in grams:
+            shared.update(self._grams.get(g, ()))
+        scored = []
+        for i, n in shared.items():
+            sim = n / (len(grams) + self._gram_count[i] - n)
+            if sim >= self.MIN_SIMILARITY:
+                scored.append((-sim, i))
+        scored.sort()
+        return [i for _, i in scored]
+
+    def search(self, query: str, limit: int = 5) -> list[CoinSearchResult]:
+        q = query.strip().lower()
+        if not q:
+            return []
+        found: list[int] = []
+        seen: set[int] = set()
+
+        def take(ids: Iterable[int]) -> None:
+            for i in ids:
+                if len(found) >= limit:
+                    return
+                if i not in seen:
+                    seen.add(i)
+                    found.append(i)
+
+        take(self._exact.get(q, ()))
+        take(self._prefix(q))
+        if len(found) < limit:
+            take(self._fuzzy(q))
+        return [self.coins[i] for i in found]
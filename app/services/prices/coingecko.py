@@ -1,10 +1,13 @@
 from __future__ import annotations
-from typing import Iterable
+from typing import Iterable, Mapping
 import aiohttp
+from .batching import SimplePriceBatch, plan_simple_price_batches
 from .types import CoinSearchResult
 
 class CoinGeckoClient:
     BASE = "https://api.coingecko.com/api/v3"
+    MAX_URL_LENGTH = 4096
+    MAX_IDS_PER_CALL = 250
 
     def __init__(self, session: aiohttp.ClientSession) -> None:
         self._session = session
@@ -31,6 +34,24 @@ class CoinGeckoClient:
             )
         return out
 
+    async def coins_list(self) -> list[dict]:
+        """Every listed coin: [{id, symbol, name}, ...]."""
+        async with self._session.get(
+            f"{self.BASE}/coins/list", timeout=aiohttp.ClientTimeout(total=60)
+        ) as r:
+            r.raise_for_status()
+            return await r.json()
+
+    async def coins_markets(self, page: int, per_page: int = 250) -> list[dict]:
+        """One page of coins by market cap, most valuable first."""
+        async with self._session.get(
+            f"{self.BASE}/coins/markets",
+            params={"vs_currency": "usd", "order": "market_cap_desc", "per_page": per_page, "page": page},
+            timeout=aiohttp.ClientTimeout(total=20),
+        ) as r:
+            r.raise_for_status()
+            return await r.json()
+
     async def simple_price(self, coin_ids: Iterable[str], vs_currencies: Iterable[str]) -> dict[str, dict[str, float]]:
         ids = ",".join(sorted(set([c.strip().lower() for c in coin_ids if c])))
         vs = ",".join(sorted(set([v.strip().lower() for v in vs_currencies if v])))
@@ -44,3 +65,24 @@ class CoinGeckoClient:
         ) as r:
             r.raise_for_status()
             return await r.json()
+
+    def plan_batches(self, demand: Mapping[str, Iterable[str]]) -> list[SimplePriceBatch]:
+        """Splits coin_id -> quotes demand into /simple/price calls within URL limits."""
+        return plan_simple_price_batches(
+            demand,
+            base_url_length=len(f"{self.BASE}/simple/price"),
+            max_url_length=self.MAX_URL_LENGTH,
+            max_ids=self.MAX_IDS_PER_CALL,
+        )
+
+    async def fetch_batch(self, batch: SimplePriceBatch) -> dict[tuple[str, str], float]:
+        """Returns: (coin_id, quote) -> price for everything the batch asked for."""
+        data = await self.simple_price(batch.ids, batch.vs_currencies)
+        out: dict[tuple[str, str], float] = {}
+        for coin_id in batch.ids:
+            row = data.get(coin_id) or {}
+            for quote in batch.vs_currencies:
+                p = row.get(quote)
+                if p is not None:
+                    out[(coin_id, quote)] = float(p)
+        return out
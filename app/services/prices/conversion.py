@@ -0,0 +1,37 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Collection
+from .types import PairKey
+
+
+@dataclass(frozen=True)
+class QuotePolicy:
+    """
+    Which crypto quotes CoinGecko is asked for. Coins are fetched in
+    `anchor`, and every other quote is derived as anchor price × anchor/quote
+    FX rate, unless it's in `native`. An empty anchor turns conversion off.
+    """
+
+    anchor: str = "usd"
+    native: frozenset[str] = frozenset()
+
+    def derived(self, quote: str) -> bool:
+        q = quote.lower()
+        return bool(self.anchor) and q != self.anchor and q not in self.native
+
+    def split(self, pairs: Collection[PairKey]) -> tuple[set[PairKey], dict[PairKey, tuple[PairKey, PairKey]]]:
+        """
+        (crypto pairs to fetch, derived pair -> (anchor pair, fx pair)); the
+        anchor pairs of derived ones are among those to fetch.
+        """
+        fetch: set[PairKey] = set()
+        derived: dict[PairKey, tuple[PairKey, PairKey]] = {}
+        for pair in pairs:
+            kind, coin_id, quote = pair
+            if not self.derived(quote):
+                fetch.add(pair)
+                continue
+            anchor = (kind, coin_id, self.anchor)
+            derived[pair] = (anchor, ("fx", self.anchor.upper(), quote.upper()))
+            fetch.add(anchor)
+        return fetch, derived
@@ -0,0 +1,96 @@
+"""
+Local fake price stream speaking WebSocketPriceSource's protocol, for
+development, benchmarks and tests:
+
+    python -m app.services.prices.fake_feed --port 8765
+
+then run a checker with PRICE_SOURCE=stream and
+PRICE_STREAM_URL=ws://localhost:8765/ws.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import random
+import time
+from aiohttp import WSMsgType, web
+from .types import PairKey
+
+
+class FakeFeed:
+    """
+    Random-walks a price for every pair any client subscribed to and sends
+    each client its pairs every `interval` seconds. `push()` injects an exact
+    price (e.g. a target crossing) to all subscribers right away.
+    """
+
+    def __init__(self, interval: float = 1.0, volatility: float = 0.002, seed: int | None = None) -> None:
+        self.interval = interval
+        self.volatility = volatility
+        self.prices: dict[PairKey, float] = {}
+        self._rng = random.Random(seed)
+        self._clients: dict[web.WebSocketResponse, set[PairKey]] = {}
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/ws", self._handle)
+        return app
+
+    async def push(self, pair: PairKey, price: float) -> None:
+        self.prices[pair] = price
+        for ws, pairs in list(self._clients.items()):
+            if pair in pairs:
+                await self._send(ws, pair, price)
+
+    async def _send(self, ws: web.WebSocketResponse, pair: PairKey, price: float) -> None:
+        try:
+            await ws.send_str(json.dumps({"pair": list(pair), "price": price, "ts": time.time()}))
+        except ConnectionError:
+            pass
+
+    def _step(self, pair: PairKey) -> float:
+        price = self.prices.get(pair) or self._rng.uniform(1, 1000)
+        price *= 1 + self._rng.gauss(0, self.volatility)
+        self.prices[pair] = price
+        return price
+
+    async def _ticker(self, ws: web.WebSocketResponse) -> None:
+        while not ws.closed:
+            for pair in list(self._clients.get(ws, ())):
+                await self._send(ws, pair, self._step(pair))
+            await asyncio.sleep(self.interval)
+
+    async def _handle(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        self._clients[ws] = set()
+        ticker = asyncio.create_task(self._ticker(ws))
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                data = json.loads(msg.data)
+                pairs = {(str(p[0]), str(p[1]), str(p[2])) for p in data.get("pairs") or []}
+                if data.get("op") == "subscribe":
+                    self._clients[ws] |= pairs
+                elif data.get("op") == "unsubscribe":
+                    self._clients[ws] -= pairs
+        finally:
+            ticker.cancel()
+            self._clients.pop(ws, None)
+        return ws
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--interval", type=float, default=1.0)
+    ap.add_argument("--volatility", type=float, default=0.002)
+    args = ap.parse_args()
+    feed = FakeFeed(interval=args.interval, volatility=args.volatility)
+    web.run_app(feed.app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
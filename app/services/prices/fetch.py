@@ -0,0 +1,25 @@
+from __future__ import annotations
+from typing import Iterable
+from .cache import COINGECKO, FRANKFURTER, PriceCache
+from .registry import PriceRouter
+from .types import PairKey
+
+
+def cache_key(pair: PairKey) -> tuple[str, str, str]:
+    kind, key, quote = pair
+    return (COINGECKO if kind == "crypto" else FRANKFURTER, key, quote)
+
+
+async def fetch_prices(
+    pairs: Iterable[PairKey],
+    router: PriceRouter,
+    price_cache: PriceCache,
+) -> dict[PairKey, float]:
+    """
+    Current prices for `pairs`, each from the provider the router picks for
+    it. Every price fetched also goes into `price_cache`.
+    """
+    prices = await router.fetch_many(pairs)
+    for pair, price in prices.items():
+        price_cache.set(cache_key(pair), price)
+    return prices
@@ -1,66 +1,64 @@
 from __future__ import annotations
-from typing import Iterable, Dict
+import asyncio
+import time
+from typing import Dict
 import aiohttp
 
+# Currencies the ECB reference rates (and so Frankfurter) cover.
+CURRENCIES = frozenset(
+    "AUD BGN BRL CAD CHF CNY CZK DKK EUR GBP HKD HUF IDR ILS INR ISK JPY KRW "
+    "MXN MYR NOK NZD PHP PLN RON SEK SGD THB TRY USD ZAR".split()
+)
 
-class FrankfurterClient:
-    def __init__(self, http: aiohttp.ClientSession):
-        self.http = http
-        self.base_url = "https://api.frankfurter.app"
-
-    async def _nbu_rate_to_uah(self, code: str) -> float:
-        """
-        Returns: 1 <CODE> in UAH (e.g. USD->UAH).
-        """
-        code = code.upper()
-        if code == "UAH":
-            return 1.0
-
-        url = f"https://bank.gov.ua/NBUStatService/v1/statdirectory/exchange?valcode={code}&json"
-        async with self.http.get(url) as r:
-            r.raise_for_status()
-            data = await r.json()
-
-
-        if not data or "rate" not in data[0]:
-            raise RuntimeError(f"NBU rate not found for {code}")
 
-        return float(data[0]["rate"])
-
-    async def latest(self, base: str, symbols: Iterable[str]) -> Dict[str, float]:
-        base = base.upper()
-        symbols = [s.upper() for s in symbols]
-
-
-        if base == "UAH" or "UAH" in symbols:
-            out: Dict[str, float] = {}
-
-            if base != "UAH":
-
-                base_to_uah = await self._nbu_rate_to_uah(base)
-                for s in symbols:
-                    if s == "UAH":
-                        out["UAH"] = base_to_uah
-                    else:
-
-                        sym_to_uah = await self._nbu_rate_to_uah(s)
-                        out[s] = base_to_uah / sym_to_uah
-                return out
+class FrankfurterClient:
+    """
+    ECB reference rates via Frankfurter.
 
+    One /latest call returns every currency against EUR; that vector is
+    kept for `refresh_seconds` and every cross-rate is computed from it, so
+    the number of bases asked for doesn't change the number of requests.
+    """
 
-            for s in symbols:
-                if s == "UAH":
-                    out["UAH"] = 1.0
-                else:
-                    sym_to_uah = await self._nbu_rate_to_uah(s)
-                    out[s] = 1.0 / sym_to_uah
-            return out
+    def __init__(self, http: aiohttp.ClientSession, refresh_seconds: float = 300.0) -> None:
+        self.http = http
+        self.base_url = "https://api.frankfurter.app"
+        self.refresh_seconds = refresh_seconds
+        self._rates: Dict[str, float] = {}
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
 
+    def fresh(self) -> bool:
+        """True while `table()` is served without a request."""
+        return time.time() < self._expires_at
 
-        params = {"from": base, "to": ",".join(symbols)}
-        async with self.http.get(f"{self.base_url}/latest", params=params) as r:
+    async def _refresh(self) -> None:
+        async with self.http.get(f"{self.base_url}/latest") as r:
             r.raise_for_status()
             data = await r.json()
 
-        rates = data.get("rates") or {}
-        return {k.upper(): float(v) for k, v in rates.items()}
+        base = str(data.get("base") or "EUR").upper()
+        rates: Dict[str, float] = {base: 1.0}
+        for code, rate in (data.get("rates") or {}).items():
+            if rate:
+                rates[code.upper()] = 1.0 / float(rate)
+        if len(rates) == 1:
+            raise RuntimeError("Frankfurter returned an empty rates table")
+
+        self._rates = rates
+        self._expires_at = time.time() + self.refresh_seconds
+
+    async def table(self) -> Dict[str, float]:
+        """Returns: code -> price of 1 unit in EUR, including EUR itself."""
+        if self.fresh():
+            return self._rates
+        async with self._lock:
+            if not self.fresh():
+                try:
+                    await self._refresh()
+                except Exception:
+                    if not self._rates:
+                        raise
+                    # ECB rates change once a day: the last vector will do.
+                    self._expires_at = time.time() + self.refresh_seconds
+        return self._rates
@@ -0,0 +1,26 @@
+from __future__ import annotations
+from typing import Iterable, Mapping
+from .types import PairKey
+
+
+def cross_rate(table: Mapping[str, float], base: str, quote: str) -> float | None:
+    """
+    base/quote from a table of code -> price of 1 unit in a common
+    currency; None if either code is missing.
+    """
+    base_value = table.get(base.upper())
+    quote_value = table.get(quote.upper())
+    if not base_value or not quote_value:
+        return None
+    return base_value / quote_value
+
+
+def cross_rates(table: Mapping[str, float], pairs: Iterable[PairKey]) -> dict[PairKey, float]:
+    """Every fx pair in `pairs` `table` can price."""
+    prices: dict[PairKey, float] = {}
+    for pair in pairs:
+        _, base, quote = pair
+        rate = cross_rate(table, base, quote)
+        if rate is not None:
+            prices[pair] = rate
+    return prices
@@ -0,0 +1,74 @@
+from __future__ import annotations
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Dict
+from zoneinfo import ZoneInfo
+import aiohttp
+
+KYIV = ZoneInfo("Europe/Kyiv")
+
+
+class NbuClient:
+    """
+    National Bank of Ukraine official rates.
+
+    The whole daily table is downloaded in one request and kept until the next
+    publication (midnight Kyiv time after its `exchangedate`), so every UAH
+    cross-rate is served from memory.
+    """
+
+    URL = "https://bank.gov.ua/NBUStatService/v1/statdirectory/exchange?json"
+
+    def __init__(self, http: aiohttp.ClientSession, retry_seconds: float = 600.0) -> None:
+        self.http = http
+        self.retry_seconds = retry_seconds
+        self._rates: Dict[str, float] = {}
+        self._date: str | None = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _next_publication(exchange_date: str) -> float:
+        day = datetime.strptime(exchange_date, "%d.%m.%Y").replace(tzinfo=KYIV)
+        return (day + timedelta(days=1)).timestamp()
+
+    async def _refresh(self) -> None:
+        async with self.http.get(self.URL) as r:
+            r.raise_for_status()
+            data = await r.json()
+
+        rates: Dict[str, float] = {"UAH": 1.0}
+        date: str | None = None
+        for row in data or []:
+            code = str(row.get("cc") or "").upper()
+            if code and row.get("rate") is not None:
+                rates[code] = float(row["rate"])
+                date = date or row.get("exchangedate")
+        if len(rates) == 1:
+            raise RuntimeError("NBU returned an empty rates table")
+
+        now = time.time()
+        expires_at = self._next_publication(date) if date else 0.0
+        if date == self._date or expires_at <= now:
+            # The new table isn't out yet; check again a bit later.
+            expires_at = now + self.retry_seconds
+
+        self._rates = rates
+        self._date = date
+        self._expires_at = expires_at
+
+    async def table(self) -> Dict[str, float]:
+        """Returns: code -> price of 1 unit in UAH, including UAH itself."""
+        if time.time() < self._expires_at:
+            return self._rates
+        async with self._lock:
+            if time.time() >= self._expires_at:
+                try:
+                    await self._refresh()
+                except Exception:
+                    if not self._rates:
+                        raise
+                    # Serve yesterday's table rather than nothing.
+                    self._expires_at = time.time() + self.retry_seconds
+        return self._rates
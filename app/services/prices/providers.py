@@ -0,0 +1,168 @@
+from __future__ import annotations
+from collections import defaultdict
+from typing import Collection
+import aiohttp
+from app.config import settings
+from .batching import SimplePriceBatch
+from .coingecko import CoinGeckoClient
+from .conversion import QuotePolicy
+from .frankfurter import CURRENCIES as FRANKFURTER_CURRENCIES, FrankfurterClient
+from .fx import cross_rates
+from .nbu import NbuClient
+from .registry import PriceProvider, PriceRouter, ProviderCapabilities
+from .types import PairKey
+
+
+class CoinGeckoProvider(PriceProvider):
+    """
+    Crypto prices, packed into as few /simple/price calls as fit. With an
+    `fx` router, quotes the policy derives are fetched in its anchor and
+    converted; those FX can't price fall back to CoinGecko.
+    """
+
+    name = "coingecko"
+
+    def __init__(
+        self,
+        client: CoinGeckoClient,
+        capabilities: ProviderCapabilities,
+        timeout: float,
+        policy: QuotePolicy | None = None,
+    ) -> None:
+        super().__init__(capabilities, timeout)
+        self.client = client
+        self.policy = policy or QuotePolicy(anchor="")
+        # Router for the FX legs of derived quotes; set by create_price_router.
+        self.fx: PriceRouter | None = None
+
+    @staticmethod
+    def _demand(pairs: Collection[PairKey]) -> dict[str, set[str]]:
+        demand: dict[str, set[str]] = defaultdict(set)
+        for _, coin_id, quote in pairs:
+            if coin_id:
+                demand[coin_id].add(quote)
+        return demand
+
+    def _plan(self, pairs: Collection[PairKey]) -> tuple[set[PairKey], dict[PairKey, tuple[PairKey, PairKey]]]:
+        if self.fx is None:
+            return set(pairs), {}
+        return self.policy.split(pairs)
+
+    def requests_for(self, pairs: Collection[PairKey]) -> int:
+        fetch, _ = self._plan(pairs)
+        return len(self.client.plan_batches(self._demand(fetch)))
+
+    async def _fetch(self, pairs: Collection[PairKey]) -> dict[PairKey, float]:
+        async def fetch(batch: SimplePriceBatch) -> dict[tuple[str, str], float]:
+            return await self._call(self.client.fetch_batch, batch)
+
+        batches = self.client.plan_batches(self._demand(pairs))
+        calls = [(f"{len(b.ids)}x{','.join(b.vs_currencies)}", fetch(b)) for b in batches]
+        prices: dict[PairKey, float] = {}
+        for result in await self._gather(calls):
+            for (coin_id, quote), p in (result or {}).items():
+                prices[("crypto", coin_id, quote)] = p
+        return prices
+
+    async def fetch_many(self, pairs: Collection[PairKey]) -> dict[PairKey, float]:
+        fetch, derived = self._plan(pairs)
+        prices = await self._fetch(fetch)
+        if not derived:
+            return prices
+
+        rates = await self.fx.fetch_many({fx for _, fx in derived.values()})
+        unpriced: set[PairKey] = set()
+        for pair, (anchor, fx) in derived.items():
+            price, rate = prices.get(anchor), rates.get(fx)
+            if rate is None:
+                unpriced.add(pair)
+            elif price is not None:
+                prices[pair] = price * rate
+        if unpriced:
+            prices.update(await self._fetch(unpriced))
+        return prices
+
+
+class FrankfurterProvider(PriceProvider):
+    """ECB reference rates: every fx cross computed from one cached EUR vector."""
+
+    name = "frankfurter"
+
+    def __init__(self, client: FrankfurterClient, capabilities: ProviderCapabilities, timeout: float) -> None:
+        super().__init__(capabilities, timeout)
+        self.client = client
+
+    def requests_for(self, pairs: Collection[PairKey]) -> int:
+        # One request refreshes the vector, however many bases are asked for.
+        return 0 if not pairs or self.client.fresh() else 1
+
+    async def fetch_many(self, pairs: Collection[PairKey]) -> dict[PairKey, float]:
+        return cross_rates(await self._call(self.client.table), pairs)
+
+
+class NbuProvider(PriceProvider):
+    """NBU official rates: every fx cross computed from one cached daily table."""
+
+    name = "nbu"
+
+    def __init__(self, client: NbuClient, capabilities: ProviderCapabilities, timeout: float) -> None:
+        super().__init__(capabilities, timeout)
+        self.client = client
+
+    def requests_for(self, pairs: Collection[PairKey]) -> int:
+        # The table is downloaded once a day, not per fetch.
+        return 0
+
+    async def fetch_many(self, pairs: Collection[PairKey]) -> dict[PairKey, float]:
+        return cross_rates(await self._call(self.client.table), pairs)
+
+
+def create_price_router(http: aiohttp.ClientSession) -> PriceRouter:
+    """
+    CoinGecko for crypto, in CRYPTO_ANCHOR_QUOTE and converted with the fx
+    rates below; Frankfurter for the currencies the ECB covers and NBU for
+    the rest (UAH crosses) and as Frankfurter's fallback.
+    """
+    timeout = settings.PROVIDER_TIMEOUT_SECONDS
+    coingecko = CoinGeckoProvider(
+        CoinGeckoClient(http),
+        ProviderCapabilities(
+            kinds=frozenset({"crypto"}),
+            max_concurrency=settings.COINGECKO_CONCURRENCY,
+            requests_per_minute=settings.COINGECKO_REQUESTS_PER_MINUTE,
+            freshness_seconds=60,
+        ),
+        timeout,
+        QuotePolicy(
+            anchor=settings.CRYPTO_ANCHOR_QUOTE.lower(),
+            native=frozenset(q.lower() for q in settings.CRYPTO_NATIVE_QUOTES),
+        ),
+    )
+    router = PriceRouter(
+        [
+            coingecko,
+            FrankfurterProvider(
+                FrankfurterClient(http, settings.FRANKFURTER_REFRESH_SECONDS),
+                ProviderCapabilities(
+                    kinds=frozenset({"fx"}),
+                    currencies=FRANKFURTER_CURRENCIES,
+                    max_concurrency=settings.FRANKFURTER_CONCURRENCY,
+                    freshness_seconds=24 * 3600,
+                ),
+                timeout,
+            ),
+            NbuProvider(
+                NbuClient(http),
+                ProviderCapabilities(
+                    kinds=frozenset({"fx"}),
+                    max_concurrency=1,
+                    freshness_seconds=24 * 3600,
+                    # Official daily fixing: only where the ECB has no rate.
+                    cost=2.0,
+                ),
+                timeout,
+            ),
+        ]
+    )
+    coingecko.fx = router
+    return router
@@ -0,0 +1,39 @@
+from __future__ import annotations
+from .cache import PriceCache
+from .fetch import cache_key
+from .providers import CoinGeckoProvider
+from .registry import PriceRouter
+from .types import pair_key
+
+
+async def crypto_price(router: PriceRouter, cache: PriceCache, coin_id: str, quote: str) -> float | None:
+    """Price of `coin_id` in `quote`, served from the cache when possible."""
+    pair = pair_key("crypto", coin_id, "", quote)
+    provider = router.route(pair)
+    if isinstance(provider, CoinGeckoProvider) and provider.fx is not None and provider.policy.derived(pair[2]):
+        # Anchor price and fx rate are cached on their own, so every quote
+        # of a coin shares one CoinGecko call.
+        anchor = provider.policy.anchor
+        price = await crypto_price(router, cache, coin_id, anchor)
+        if price is None:
+            return None
+        rate = await fx_rate(router, cache, anchor, quote)
+        if rate is not None:
+            return price * rate
+
+    async def fetch() -> float | None:
+        return (await router.fetch_many([pair])).get(pair)
+
+    return await cache.get_or_fetch(cache_key(pair), fetch)
+
+
+async def fx_rate(router: PriceRouter, cache: PriceCache, base: str, quote: str) -> float | None:
+    """base/quote exchange rate, served from the cache when possible."""
+    pair = pair_key("fx", None, base, quote)
+    if pair[1] == pair[2]:
+        return 1.0
+
+    async def fetch() -> float | None:
+        return (await router.fetch_many([pair])).get(pair)
+
+    return await cache.get_or_fetch(cache_key(pair), fetch)
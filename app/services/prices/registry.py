@@ -0,0 +1,145 @@
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Collection, Iterable
+import aiohttp
+from app.services.metrics import PROVIDER_REQUEST_SECONDS, PROVIDER_REQUESTS
+from app.services.ratelimit import TokenBucket
+from .types import PairKey
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ProviderCapabilities:
+    """What a provider can price and how hard it may be pushed."""
+
+    kinds: frozenset[str]
+    # Upper-case codes both fx legs / the crypto quote must be in; None: any.
+    currencies: frozenset[str] | None = None
+    max_concurrency: int = 4
+    # 0 means no limit.
+    requests_per_minute: float = 0.0
+    # How often the upstream data actually changes.
+    freshness_seconds: float = 60.0
+    # Relative cost of routing a pair here; the router prefers the lowest.
+    cost: float = 1.0
+
+
+class PriceProvider(ABC):
+    """
+    A price source behind one batch call. Implementations go through
+    `_call` for every upstream request so the declared concurrency, rate
+    limit and timeout hold no matter who is asking.
+    """
+
+    name: str
+
+    def __init__(self, capabilities: ProviderCapabilities, timeout: float) -> None:
+        self.capabilities = capabilities
+        self.timeout = timeout
+        self._sem = asyncio.Semaphore(capabilities.max_concurrency)
+        rpm = capabilities.requests_per_minute
+        self._bucket = TokenBucket(rpm / 60.0, max(1.0, rpm / 4.0)) if rpm else None
+
+    def supports(self, pair: PairKey) -> bool:
+        kind, key, quote = pair
+        caps = self.capabilities
+        if kind not in caps.kinds:
+            return False
+        if caps.currencies is None:
+            return True
+        if quote.upper() not in caps.currencies:
+            return False
+        return kind == "crypto" or key.upper() in caps.currencies
+
+    async def _call(self, fn: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        async with self._sem:
+            if self._bucket is not None:
+                await self._bucket.acquire()
+            start = time.perf_counter()
+            status = "error"
+            try:
+                result = await asyncio.wait_for(fn(*args), self.timeout)
+                status = "ok"
+                return result
+            except asyncio.TimeoutError:
+                status = "timeout"
+                raise
+            except aiohttp.ClientResponseError as e:
+                status = str(e.status)
+                raise
+            finally:
+                PROVIDER_REQUEST_SECONDS.labels(self.name).observe(time.perf_counter() - start)
+                PROVIDER_REQUESTS.labels(self.name, status).inc()
+
+    async def _gather(self, calls: list[tuple[str, Awaitable[Any]]]) -> list[Any]:
+        """Runs `calls` concurrently; failed ones are logged and come back as None."""
+        results = await asyncio.gather(*(c for _, c in calls), return_exceptions=True)
+        out: list[Any] = []
+        for (label, _), result in zip(calls, results):
+            if isinstance(result, Exception):
+                log.warning("Price fetch failed for %s:%s: %r", self.name, label, result)
+                result = None
+            out.append(result)
+        return out
+
+    def requests_for(self, pairs: Collection[PairKey]) -> int:
+        """Upstream requests one `fetch_many(pairs)` costs."""
+        return 1 if pairs else 0
+
+    @abstractmethod
+    async def fetch_many(self, pairs: Collection[PairKey]) -> dict[PairKey, float]:
+        """Prices for `pairs`; whatever couldn't be priced is left out."""
+
+
+class PriceRouter:
+    """
+    Registry of price providers. Each pair goes to the cheapest provider
+    that supports it (fresher data breaks ties); pairs it fails to price
+    fall through to the next one.
+    """
+
+    def __init__(self, providers: Iterable[PriceProvider] = ()) -> None:
+        self._providers: dict[str, PriceProvider] = {}
+        for p in providers:
+            self.register(p)
+
+    def register(self, provider: PriceProvider) -> None:
+        self._providers[provider.name] = provider
+
+    def get(self, name: str) -> PriceProvider | None:
+        return self._providers.get(name)
+
+    @property
+    def providers(self) -> list[PriceProvider]:
+        return list(self._providers.values())
+
+    def candidates(self, pair: PairKey) -> list[PriceProvider]:
+        found = [p for p in self._providers.values() if p.supports(pair)]
+        found.sort(key=lambda p: (p.capabilities.cost, p.capabilities.freshness_seconds))
+        return found
+
+    def route(self, pair: PairKey) -> PriceProvider | None:
+        found = self.candidates(pair)
+        return found[0] if found else None
+
+    async def fetch_many(self, pairs: Iterable[PairKey]) -> dict[PairKey, float]:
+        prices: dict[PairKey, float] = {}
+        pending = {pair: found for pair in set(pairs) if (found := self.candidates(pair))}
+        while pending:
+            groups: dict[PriceProvider, list[PairKey]] = defaultdict(list)
+            for pair, found in pending.items():
+                groups[found.pop(0)].append(pair)
+            results = await asyncio.gather(*(p.fetch_many(ps) for p, ps in groups.items()), return_exceptions=True)
+            for provider, result in zip(groups, results):
+                if isinstance(result, Exception):
+                    log.warning("Price provider %s failed: %r", provider.name, result)
+                else:
+                    prices.update(result)
+            pending = {pair: found for pair, found in pending.items() if found and pair not in prices}
+        return prices
@@ -0,0 +1,37 @@
+from __future__ import annotations
+from datetime import timedelta
+from sqlalchemy import Float, cast, extract, func, select
+from app.db.models import PricePair, TrackerKind
+from app.db.session import SessionLocal
+from .cache import COINGECKO, PriceKey
+
+
+async def stored_price(key: PriceKey, max_age: float) -> tuple[float, float] | None:
+    """
+    (price, age in seconds) of the pair behind a cache key, as a checker
+    last stored it in `price_pairs`, if that was at most `max_age` ago.
+
+    Checkers store every tracked pair each tick, so a process that doesn't
+    check prices itself (the `bot` role) can serve those without asking
+    the provider.
+    """
+    provider, key_part, quote = key
+    p = PricePair.__table__.c
+    age = cast(extract("epoch", func.now() - p.last_checked_at), Float)
+    stmt = (
+        select(cast(p.last_price, Float), age)
+        .where(
+            p.quote == quote.upper(),
+            p.last_price.is_not(None),
+            p.last_checked_at >= func.now() - timedelta(seconds=max_age),
+        )
+        .order_by(p.last_checked_at.desc())
+        .limit(1)
+    )
+    if provider == COINGECKO:
+        stmt = stmt.where(p.kind == TrackerKind.crypto, p.coin_id == key_part)
+    else:
+        stmt = stmt.where(p.kind == TrackerKind.fx, p.coin_id.is_(None), p.base == key_part)
+    async with SessionLocal() as session:
+        row = (await session.execute(stmt)).first()
+    return (row[0], max(row[1], 0.0)) if row is not None else None
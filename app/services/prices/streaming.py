@@ -0,0 +1,193 @@
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Collection
+import aiohttp
+from .types import PairKey
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class PriceTick:
+    pair: PairKey
+    price: float
+    ts: float
+
+
+Emit = Callable[[PriceTick], None]
+FetchPrices = Callable[[Collection[PairKey]], Awaitable[dict[PairKey, float]]]
+
+
+class PriceSource(ABC):
+    """
+    A source of price updates for a set of subscribed pairs. `run()` pushes
+    every update it gets through `emit` until cancelled; `subscribe()` may be
+    called at any time to replace the set of pairs.
+    """
+
+    def __init__(self) -> None:
+        self.pairs: set[PairKey] = set()
+
+    def subscribe(self, pairs: Collection[PairKey]) -> None:
+        self.pairs = set(pairs)
+
+    @abstractmethod
+    async def run(self, emit: Emit) -> None:
+        ...
+
+
+class PollingPriceSource(PriceSource):
+    """Polls the REST providers every `interval` seconds and emits every price."""
+
+    def __init__(self, fetch: FetchPrices, interval: float) -> None:
+        super().__init__()
+        self.fetch = fetch
+        self.interval = interval
+
+    async def poll_once(self, emit: Emit, pairs: Collection[PairKey] | None = None) -> None:
+        """Polls `pairs` (all subscribed ones by default) and emits their prices."""
+        pairs = set(self.pairs if pairs is None else pairs)
+        if not pairs:
+            return
+        prices = await self.fetch(pairs)
+        now = time.time()
+        for pair, price in prices.items():
+            emit(PriceTick(pair, price, now))
+
+    async def run(self, emit: Emit) -> None:
+        while True:
+            started = time.monotonic()
+            try:
+                await self.poll_once(emit)
+            except Exception:
+                log.exception("Price poll failed")
+            await asyncio.sleep(max(self.interval - (time.monotonic() - started), 0.0))
+
+
+class WebSocketPriceSource(PriceSource):
+    """
+    Push updates over a websocket with a small JSON protocol:
+
+        -> {"op": "subscribe" | "unsubscribe", "pairs": [[kind, key, quote], ...]}
+        <- {"pair": [kind, key, quote], "price": 1.23, "ts": 1700000000.0}
+
+    Reconnects with backoff and re-sends the full subscription each time.
+    """
+
+    def __init__(self, http: aiohttp.ClientSession, url: str, max_backoff: float = 30.0) -> None:
+        super().__init__()
+        self.http = http
+        self.url = url
+        self.max_backoff = max_backoff
+        self.connected = False
+        self._changed = asyncio.Event()
+
+    def subscribe(self, pairs: Collection[PairKey]) -> None:
+        super().subscribe(pairs)
+        self._changed.set()
+
+    async def run(self, emit: Emit) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                async with self.http.ws_connect(self.url, heartbeat=30) as ws:
+                    self.connected = True
+                    backoff = 1.0
+                    await self._session(ws, emit)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("Price stream %s failed: %r", self.url, e)
+            finally:
+                self.connected = False
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    async def _session(self, ws: aiohttp.ClientWebSocketResponse, emit: Emit) -> None:
+        sent: set[PairKey] = set()
+
+        async def sync_subscriptions() -> None:
+            nonlocal sent
+            while True:
+                self._changed.clear()
+                wanted = set(self.pairs)
+                if wanted - sent:
+                    await ws.send_json({"op": "subscribe", "pairs": [list(p) for p in wanted - sent]})
+                if sent - wanted:
+                    await ws.send_json({"op": "unsubscribe", "pairs": [list(p) for p in sent - wanted]})
+                sent = wanted
+                await self._changed.wait()
+
+        sync = asyncio.create_task(sync_subscriptions())
+        try:
+            async for msg in ws:
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    if msg.type in (aiohttp.WSMsgType.ERROR, aiohttp.WSMsgType.CLOSE):
+                        break
+                    continue
+                try:
+                    data = json.loads(msg.data)
+                    pair = tuple(data["pair"])
+                    tick = PriceTick((str(pair[0]), str(pair[1]), str(pair[2])), float(data["price"]), float(data.get("ts") or time.time()))
+                except (ValueError, KeyError, IndexError, TypeError):
+                    log.debug("Ignoring malformed stream message: %r", msg.data)
+                    continue
+                emit(tick)
+        finally:
+            sync.cancel()
+
+
+class FallbackPriceSource(PriceSource):
+    """
+    Streams from `primary`; pairs it hasn't updated for `stale_after`
+    seconds are polled from `fallback` at its own interval until the primary
+    delivers them again. Staleness is tracked per pair: a connected stream
+    that doesn't carry a pair (an FX rate, an illiquid coin, a quote it
+    doesn't list) gets that pair polled without polling everything else.
+    """
+
+    def __init__(self, primary: PriceSource, fallback: PollingPriceSource, stale_after: float) -> None:
+        super().__init__()
+        self.primary = primary
+        self.fallback = fallback
+        self.stale_after = stale_after
+        # pair -> monotonic time of its last primary update (or subscription).
+        self._last_primary: dict[PairKey, float] = {}
+
+    def subscribe(self, pairs: Collection[PairKey]) -> None:
+        super().subscribe(pairs)
+        now = time.monotonic()
+        self._last_primary = {p: self._last_primary.get(p, now) for p in self.pairs}
+        self.primary.subscribe(pairs)
+        self.fallback.subscribe(pairs)
+
+    def stale(self) -> set[PairKey]:
+        cutoff = time.monotonic() - self.stale_after
+        return {p for p, at in self._last_primary.items() if at < cutoff}
+
+    async def run(self, emit: Emit) -> None:
+        def from_primary(tick: PriceTick) -> None:
+            if tick.pair in self._last_primary:
+                self._last_primary[tick.pair] = time.monotonic()
+            emit(tick)
+
+        primary = asyncio.create_task(self.primary.run(from_primary))
+        try:
+            while True:
+                stale = self.stale()
+                if stale:
+                    try:
+                        await self.fallback.poll_once(emit, stale)
+                    except Exception:
+                        log.exception("Fallback price poll failed")
+                    await asyncio.sleep(self.fallback.interval)
+                else:
+                    await asyncio.sleep(1.0)
+        finally:
+            primary.cancel()
+            await asyncio.gather(primary, return_exceptions=True)
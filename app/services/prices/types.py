@@ -6,3 +6,12 @@ class CoinSearchResult:
     name: str
     symbol: str
     market_cap_rank: int | None
+
+# (kind, coin_id for crypto / base for fx, quote) in the casing providers use.
+PairKey = tuple[str, str, str]
+
+
+def pair_key(kind: str, coin_id: str | None, base: str, quote: str) -> PairKey:
+    if kind == "crypto":
+        return ("crypto", coin_id or "", quote.lower())
+    return ("fx", base.upper(), quote.upper())
@@ -0,0 +1,106 @@
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from app.services.metrics import TICK_FAILURES, observe_tick
+from app.services.partitions import PartitionLeaser
+from app.services.prices.cache import PriceCache
+from app.services.prices.fetch import cache_key
+from app.services.prices.streaming import PriceSource, PriceTick
+from app.services.prices.types import PairKey
+from app.services.timing import PhaseTimer
+from app.services.tracker_snapshot import TrackerSnapshot
+
+log = logging.getLogger(__name__)
+
+
+class StreamingChecker:
+    """
+    Evaluates trackers as price updates arrive from a PriceSource instead of
+    on a fixed interval. Updates that pile up while an evaluation runs are
+    merged (latest price per pair wins) into the next one, and only trackers
+    on the updated pairs are evaluated, from the resident TrackerSnapshot.
+    """
+
+    def __init__(
+        self,
+        source: PriceSource,
+        price_cache: PriceCache,
+        snapshot: TrackerSnapshot,
+        leaser: PartitionLeaser | None = None,
+        refresh_seconds: float = 30.0,
+    ) -> None:
+        self.source = source
+        self.price_cache = price_cache
+        self.snapshot = snapshot
+        self.leaser = leaser
+        self.refresh_seconds = refresh_seconds
+        self._ids: dict[PairKey, list[int]] = {}
+        self._pending: dict[PairKey, PriceTick] = {}
+        self._wakeup = asyncio.Event()
+        # Held while an evaluation runs, so partitions are only given up between them.
+        self._lock = asyncio.Lock()
+
+    def _emit(self, tick: PriceTick) -> None:
+        self.price_cache.set(cache_key(tick.pair), tick.price)
+        if tick.pair in self._ids:
+            self._pending[tick.pair] = tick
+            self._wakeup.set()
+
+    async def refresh(self) -> None:
+        """
+        Reloads the active pairs this process is responsible for and
+        resubscribes. Runs between evaluations, so partitions are given up
+        with nothing in flight.
+        """
+        async with self._lock:
+            partitions = await self.snapshot.claim_partitions(self.leaser)
+            ids: dict[PairKey, list[int]] = defaultdict(list)
+            for pid, key in self.snapshot.active_pairs(partitions).items():
+                ids[key].append(pid)
+            self._ids = dict(ids)
+        self.source.subscribe(self._ids.keys())
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.refresh()
+            except Exception:
+                log.exception("Failed to refresh streamed pairs")
+
+    async def _evaluate_loop(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            async with self._lock:
+                await self._evaluate()
+
+    async def _evaluate(self) -> None:
+        batch, self._pending = self._pending, {}
+        pair_prices = {pid: tick.price for pair, tick in batch.items() for pid in self._ids.get(pair, ())}
+        if not pair_prices:
+            return
+        timer = PhaseTimer()
+        start = time.perf_counter()
+        try:
+            await self.snapshot.check(pair_prices, timer)
+        except Exception:
+            TICK_FAILURES.inc()
+            log.exception("Failed to evaluate %d streamed pair(s)", len(pair_prices))
+        observe_tick(timer, time.perf_counter() - start)
+
+    async def run(self) -> None:
+        await self.refresh()
+        tasks = [
+            asyncio.create_task(self.source.run(self._emit)),
+            asyncio.create_task(self._refresh_loop()),
+            asyncio.create_task(self._evaluate_loop()),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,20 @@
+from __future__ import annotations
+from bisect import bisect_left, bisect_right
+from typing import Sequence
+
+
+def crossed_slice(targets: Sequence[float], gte: bool, last: float | None, current: float) -> range:
+    """
+    Positions in the sorted `targets` of one direction that a move from
+    `last` to `current` crosses; they are always a contiguous slice.
+
+    gte: last < target <= current; lte: current <= target < last. With no
+    previous price every already-satisfied target is in.
+    """
+    if gte:
+        hi = bisect_right(targets, current)
+        lo = 0 if last is None else bisect_right(targets, last)
+    else:
+        lo = bisect_left(targets, current)
+        hi = len(targets) if last is None else bisect_left(targets, last)
+    return range(lo, hi)
@@ -0,0 +1,340 @@
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Collection, Iterable, Mapping
+from sqlalchemy import BigInteger, Float, Select, cast, extract, literal_column, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from app.config import settings
+from app.db.listen import listen, unlisten
+from app.db.models import Direction, PricePair, Tracker
+from app.db.session import SessionLocal
+from app.services.checker import store_prices
+from app.services.metrics import ALERTS_FIRED, TRACKERS_EVALUATED
+from app.services.partitions import PartitionLeaser
+from app.services.prices.types import PairKey, pair_key
+from app.services.timing import PhaseTimer
+from app.services.tracker_table import TrackerTable, TrackerView
+
+log = logging.getLogger(__name__)
+
+# Fed by the trackers triggers installed in app.db.init_db: comma-separated
+# ids of the changed trackers, or "*" when a statement changed too many.
+CHANNEL = "tracker_changes"
+
+# Per-row hash the snapshot is checked against; exact numeric arithmetic,
+# so the stored sum and the recomputed one agree.
+_ROW_HASH = (
+    "mod(trackers.id::numeric * 1000003 + trackers.tg_user_id::numeric * 999983"
+    " + trackers.pair_id::numeric * 998353 + round(trackers.target * 100000000) * 997"
+    " + CASE WHEN trackers.direction = 'gte' THEN 1 ELSE 2 END, 2305843009213693951)"
+)
+_CHECKSUM = text(
+    f"SELECT count(*), coalesce(sum({_ROW_HASH}), 0) FROM trackers "
+    "WHERE trackers.is_active AND trackers.pair_id IS NOT NULL"
+)
+
+_LOAD_BATCH = 20_000
+
+
+def _select_trackers() -> Select:
+    """Core query with everything cast in SQL, so rows unpack straight into TrackerTable.add."""
+    t = Tracker.__table__
+    return select(
+        t.c.id,
+        t.c.tg_user_id,
+        t.c.pair_id,
+        (t.c.direction == Direction.gte).label("gte"),
+        cast(t.c.target, Float),
+        cast(extract("epoch", t.c.created_at), Float),
+        cast(literal_column(_ROW_HASH), BigInteger),
+    ).where(t.c.is_active, t.c.pair_id.is_not(None))
+
+
+def _select_pairs() -> Select:
+    p = PricePair.__table__
+    return select(
+        p.c.id,
+        p.c.kind,
+        p.c.coin_id,
+        p.c.base,
+        p.c.quote,
+        cast(p.c.last_price, Float),
+        cast(extract("epoch", p.c.last_checked_at), Float),
+    )
+
+
+def _add_pairs(table: TrackerTable, rows: Iterable) -> None:
+    for pid, kind, coin_id, base, quote, last_price, checked_at in rows:
+        table.add_pair(pid, pair_key(kind, coin_id, base, quote), base, quote, last_price, checked_at)
+
+
+class TrackerSnapshot:
+    """
+    Every active tracker, resident in memory as a TrackerTable, so a check
+    reads nothing from the database.
+
+    Loaded once on `start()`, then kept current by the change notifications
+    of the trackers table: only the changed rows are read back. A count and
+    a sum of per-row hashes are kept alongside and compared with the same
+    aggregate over the table every `resync_seconds`; a mismatch (a missed
+    notification) reloads everything.
+
+    Pair prices are loaded with the trackers and then updated by the
+    checker as it stores new ones, via `stored()`. Reads never overwrite a
+    price checked later than the one they bring, so a commit that lands
+    while a (re)load runs isn't undone by it: the next check can't fire the
+    same crossing again.
+
+    Trackers are stamped with the database's now(), so checks run on that
+    clock too (`now()`): the offset from this host's clock is measured on
+    every load and resync.
+    """
+
+    def __init__(self, engine: AsyncEngine, resync_seconds: float = 300.0) -> None:
+        self.engine = engine
+        self.resync_seconds = resync_seconds
+        self.table = TrackerTable()
+        # Database clock minus this host's.
+        self._clock_offset = timedelta(0)
+        self._changed: set[int] = set()
+        self._reload = False
+        self._listener_lost = False
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._listener: AsyncConnection | None = None
+        self._tasks: list[asyncio.Task] = []
+        # Partitions the prices were last reloaded for; None = every pair.
+        self._partitions: set[int] | None = None
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    async def start(self) -> None:
+        # Listen first: changes committed while loading are applied after.
+        await self._listen()
+        await self.sync_clock()
+        await self.load()
+        self._tasks = [
+            asyncio.create_task(self._apply_loop(), name="tracker-snapshot-apply"),
+            asyncio.create_task(self._resync_loop(), name="tracker-snapshot-resync"),
+        ]
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._close_listener()
+
+    def _on_notify(self, payload: str) -> None:
+        if payload == "*":
+            self._reload = True
+        else:
+            self._changed.update(int(i) for i in payload.split(",") if i)
+        self._wakeup.set()
+
+    def _on_lost(self) -> None:
+        if self._listener is None:
+            return  # closed on purpose
+        log.warning("Lost the tracker change listener; reloading the snapshot")
+        self._listener_lost = True
+        self._reload = True
+        self._wakeup.set()
+
+    async def _listen(self) -> None:
+        await self._close_listener()
+        self._listener_lost = False
+        self._listener = await listen(self.engine, CHANNEL, self._on_notify, self._on_lost)
+
+    async def _close_listener(self) -> None:
+        conn, self._listener = self._listener, None
+        if conn is not None:
+            await unlisten(conn)
+
+    async def load(self) -> None:
+        """Replaces the snapshot with the stored active trackers."""
+        async with self._lock:
+            self._changed.clear()
+            self._reload = False
+            table = TrackerTable()
+            t = Tracker.__table__
+            async with self.engine.connect() as conn:
+                # One snapshot for both queries: every tracker's pair is there.
+                conn = await conn.execution_options(isolation_level="REPEATABLE READ")
+                res = await conn.execute(
+                    _select_pairs().where(PricePair.__table__.c.id.in_(select(t.c.pair_id).where(t.c.is_active)))
+                )
+                _add_pairs(table, res.all())
+                # By target, so every insert into the sorted arrays is an append.
+                res = await conn.stream(_select_trackers().order_by(t.c.target))
+                async for rows in res.partitions(_LOAD_BATCH):
+                    for row in rows:
+                        table.add(*row)
+            # Prices stored into the old table since the read began.
+            table.merge_prices(self.table)
+            self.table = table
+        log.info("Tracker snapshot loaded: %d trackers on %d pairs", len(table), len(table.pairs))
+
+    async def apply(self, ids: Iterable[int]) -> None:
+        """Re-reads the trackers `ids` and updates or drops them."""
+        ids = sorted(ids)
+        if not ids:
+            return
+        async with self._lock:
+            async with self.engine.connect() as conn:
+                conn = await conn.execution_options(isolation_level="REPEATABLE READ")
+                res = await conn.execute(_select_trackers().where(Tracker.__table__.c.id.in_(ids)))
+                rows = res.all()
+                pair_ids = sorted({row.pair_id for row in rows})
+                pairs = []
+                if pair_ids:
+                    # Also the pairs the removal below may empty and drop.
+                    res = await conn.execute(_select_pairs().where(PricePair.__table__.c.id.in_(pair_ids)))
+                    pairs = res.all()
+            # Nothing awaits from here on: a check sees the table before the
+            # change or after it, never without the trackers being replaced.
+            held = {pid: self.table.pairs[pid] for pid in pair_ids if pid in self.table.pairs}
+            self.table.remove(set(ids))
+            _add_pairs(self.table, pairs)
+            for pid, p in held.items():
+                self.table.merge_price(pid, p.last_price, p.checked_at)
+            for row in rows:
+                self.table.add(*row)
+
+    async def _apply_loop(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            try:
+                if self._listener is None or self._listener_lost:
+                    await self._listen()
+                    await self.load()
+                elif self._reload:
+                    await self.load()
+                else:
+                    changed, self._changed = self._changed, set()
+                    await self.apply(changed)
+            except Exception:
+                log.exception("Failed to update the tracker snapshot; reloading")
+                self._reload = True
+                await asyncio.sleep(5)
+                self._wakeup.set()
+
+    def now(self) -> datetime:
+        """Current time on the database's clock."""
+        return datetime.now(timezone.utc) + self._clock_offset
+
+    async def sync_clock(self) -> None:
+        async with self.engine.connect() as conn:
+            sent = time.time()
+            db_now = (await conn.execute(text("SELECT clock_timestamp()"))).scalar_one()
+            received = time.time()
+        local = datetime.fromtimestamp((sent + received) / 2, timezone.utc)
+        self._clock_offset = db_now - local
+        if abs(self._clock_offset) > timedelta(seconds=1):
+            log.warning("Database clock is %.1fs off this host's", self._clock_offset.total_seconds())
+
+    async def checksum(self) -> tuple[int, int]:
+        async with self.engine.connect() as conn:
+            count, total = (await conn.execute(_CHECKSUM)).one()
+        return int(count), int(total)
+
+    async def resync(self) -> bool:
+        """Reloads if the table no longer matches the snapshot; True if it did."""
+        for _ in range(2):
+            if await self.checksum() == (self.table.count, self.table.hash_sum):
+                return False
+            # Could be a change whose notification is still on the way.
+            await asyncio.sleep(2)
+        log.warning(
+            "Tracker snapshot out of sync (%d in memory, %s stored); reloading",
+            self.table.count, (await self.checksum())[0],
+        )
+        await self.load()
+        return True
+
+    async def _resync_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.resync_seconds)
+            try:
+                await self.sync_clock()
+                await self.resync()
+            except Exception:
+                log.exception("Tracker snapshot resync failed")
+
+    async def reload_prices(self) -> None:
+        """
+        Re-reads the stored pair prices, e.g. for pairs another checker owned
+        until now; those this process stored later are kept.
+        """
+        p = PricePair.__table__
+        async with self.engine.connect() as conn:
+            res = await conn.execute(
+                select(p.c.id, cast(p.c.last_price, Float), cast(extract("epoch", p.c.last_checked_at), Float))
+                .where(p.c.active_trackers > 0)
+            )
+            rows = res.all()
+        for pid, price, checked_at in rows:
+            self.table.merge_price(pid, price, checked_at)
+
+    async def claim_partitions(
+        self,
+        leaser: PartitionLeaser | None,
+        before_release: Callable[[set[int]], Awaitable[None]] | None = None,
+    ) -> set[int] | None:
+        """
+        Rebalances `leaser` (see PartitionLeaser.rebalance) and returns the
+        partitions this process now checks, None without a leaser. When they
+        changed, the stored prices are reloaded: pairs another checker owned
+        until now carry its last prices.
+        """
+        partitions = await leaser.rebalance(before_release) if leaser is not None else None
+        if partitions != self._partitions:
+            await self.reload_prices()
+            self._partitions = partitions
+        return partitions
+
+    def active_pairs(self, partitions: Collection[int] | None = None) -> dict[int, PairKey]:
+        """pair_id -> key of the pairs with active trackers (in `partitions`)."""
+        pairs = self.table.pairs
+        if partitions is None:
+            return {pid: p.key for pid, p in pairs.items()}
+        owned = set(partitions)
+        n = settings.CHECKER_PARTITIONS
+        return {pid: p.key for pid, p in pairs.items() if pid % n in owned}
+
+    def find_fired(
+        self,
+        pair_prices: Mapping[int, float],
+        now: datetime,
+        pending: Mapping[int, tuple[float, datetime]] | None = None,
+    ) -> list[tuple[TrackerView, float]]:
+        """
+        Resident trackers created by `now` that `pair_prices` fire. A pair's
+        previous price comes from `pending` (evaluated, not stored yet) when
+        it has one.
+        """
+        fired, evaluated = self.table.fired(pair_prices, now, pending)
+        TRACKERS_EVALUATED.inc(evaluated)
+        ALERTS_FIRED.inc(len(fired))
+        return fired
+
+    def stored(self, pair_prices: dict[int, float], now: datetime) -> None:
+        for pid, price in pair_prices.items():
+            self.table.set_price(pid, price, now)
+
+    async def check(self, pair_prices: dict[int, float], timer: PhaseTimer | None = None) -> None:
+        """
+        Evaluates `pair_prices` and stores them with the alerts they fire, in
+        one step: for checkers that don't pipeline the two.
+        """
+        timer = timer or PhaseTimer()
+        now = self.now()
+        with timer.phase("evaluate"):
+            fired = self.find_fired(pair_prices, now)
+        with timer.phase("commit"):
+            async with SessionLocal() as session:
+                await store_prices(session, pair_prices, fired, now)
+        self.stored(pair_prices, now)
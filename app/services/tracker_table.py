@@ -0,0 +1,406 @@
+from __future__ import annotations
+import math
+from array import array
+from bisect import bisect_right
+from datetime import datetime
+from typing import Iterator, Mapping
+from app.db.models import Direction
+from app.services.threshold_index import crossed_slice
+from app.services.prices.types import PairKey
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+class TrackerView:
+    """One tracker read out of a TrackerTable, with the attributes alert rendering uses."""
+
+    __slots__ = ("id", "tg_user_id", "pair_id", "base", "quote", "direction", "target")
+
+    def __init__(
+        self, id: int, tg_user_id: int, pair_id: int, base: str, quote: str, direction: Direction, target: float
+    ) -> None:
+        self.id = id
+        self.tg_user_id = tg_user_id
+        self.pair_id = pair_id
+        self.base = base
+        self.quote = quote
+        self.direction = direction
+        self.target = target
+
+
+class _Side:
+    """Trackers of one pair and direction as parallel arrays sorted by target."""
+
+    __slots__ = ("targets", "ids", "users", "created", "hashes")
+
+    def __init__(self) -> None:
+        self.targets = array("d")
+        self.ids = array("q")
+        self.users = array("q")
+        # Creation time, epoch seconds.
+        self.created = array("d")
+        self.hashes = array("q")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, target: float, tracker_id: int, user_id: int, created: float, row_hash: int) -> None:
+        if not self.targets or target >= self.targets[-1]:
+            i = len(self.targets)
+        else:
+            i = bisect_right(self.targets, target)
+        self.targets.insert(i, target)
+        self.ids.insert(i, tracker_id)
+        self.users.insert(i, user_id)
+        self.created.insert(i, created)
+        self.hashes.insert(i, row_hash)
+
+    def remove(self, dead: set[int]) -> tuple[set[int], int]:
+        """Drops the trackers in `dead`; returns the ids dropped and the sum of their hashes."""
+        gone = [i for i, tid in enumerate(self.ids) if tid in dead]
+        if not gone:
+            return set(), 0
+        removed = {self.ids[i] for i in gone}
+        hashes = sum(self.hashes[i] for i in gone)
+        if len(gone) < 64:
+            # A few: shifting the tails is cheaper than copying everything.
+            cols = [getattr(self, name) for name in _Side.__slots__]
+            for i in reversed(gone):
+                for col in cols:
+                    del col[i]
+            return removed, hashes
+        keep = [i for i, tid in enumerate(self.ids) if tid not in dead]
+        for name in _Side.__slots__:
+            col = getattr(self, name)
+            setattr(self, name, array(col.typecode, (col[i] for i in keep)))
+        return removed, hashes
+
+
+class PairTrackers:
+    """Active trackers of one pair and the pair's stored price."""
+
+    __slots__ = ("pair_id", "key", "base", "quote", "last_price", "checked_at", "fresh", "gte", "lte")
+
+    def __init__(
+        self,
+        pair_id: int,
+        key: PairKey,
+        base: str,
+        quote: str,
+        last_price: float | None,
+        checked_at: float | None,
+    ) -> None:
+        self.pair_id = pair_id
+        self.key = key
+        self.base = base
+        self.quote = quote
+        self.last_price = last_price
+        # Epoch seconds of the last stored check.
+        self.checked_at = checked_at
+        # (target, gte, id, user id, created) of the trackers created after
+        # the last check: they haven't seen a price yet.
+        self.fresh: list[tuple[float, bool, int, int, float]] = []
+        self.gte = _Side()
+        self.lte = _Side()
+
+    def __len__(self) -> int:
+        return len(self.gte) + len(self.lte)
+
+    def add(self, gte: bool, target: float, tracker_id: int, user_id: int, created: float, row_hash: int) -> None:
+        (self.gte if gte else self.lte).add(target, tracker_id, user_id, created, row_hash)
+        if self.checked_at is None or created > self.checked_at:
+            self.fresh.append((target, gte, tracker_id, user_id, created))
+
+    def checked(self, price: float | None, checked_at: float | None) -> None:
+        self.last_price = price
+        self.checked_at = checked_at
+        if self.fresh and checked_at is not None:
+            self.fresh = [f for f in self.fresh if f[4] > checked_at]
+
+    def fresh_fired(
+        self, last: float | None, checked_at: float | None, current: float, now: float
+    ) -> tuple[set[int], list[tuple[Direction, int, int, float]]]:
+        """
+        Ids of the fresh trackers a crossing test must skip, and those of
+        them that fire as already satisfied. With no previous price every
+        satisfied target fires, which is also what a fresh tracker does;
+        only the rest need a look.
+        """
+        excluded: set[int] = set()
+        extra: list[tuple[Direction, int, int, float]] = []
+        for target, gte, tid, user_id, created in self.fresh:
+            if created > now:
+                excluded.add(tid)
+            elif last is not None and created > checked_at:
+                excluded.add(tid)
+                if target <= current if gte else target >= current:
+                    extra.append((Direction.gte if gte else Direction.lte, tid, user_id, target))
+        return excluded, extra
+
+    def fired(
+        self, last: float | None, checked_at: float | None, current: float, now: float
+    ) -> Iterator[tuple[Direction, int, int, float]]:
+        """
+        (direction, id, user id, target) of the trackers a move from `last`
+        to `current` fires: a `crossed_slice` per direction. Trackers created
+        after `checked_at` haven't seen a price yet and fire if already
+        satisfied; those created after `now` wait for the next check.
+        """
+        if checked_at is None:
+            last = None
+        excluded, extra = self.fresh_fired(last, checked_at, current, now)
+        side = self.gte
+        for i in crossed_slice(side.targets, True, last, current):
+            if side.ids[i] not in excluded:
+                yield Direction.gte, side.ids[i], side.users[i], side.targets[i]
+        side = self.lte
+        for i in crossed_slice(side.targets, False, last, current):
+            if side.ids[i] not in excluded:
+                yield Direction.lte, side.ids[i], side.users[i], side.targets[i]
+        yield from extra
+
+
+class TrackerTable:
+    """
+    Active trackers packed into per-pair arrays: forty bytes a tracker
+    (plus a fixed few hundred per pair) instead of a Row with Decimal and
+    datetime fields. An id -> pair map (about seventy bytes a tracker more)
+    lets a change touch only its tracker's pair. Each pair's trackers are
+    sorted per direction by target, so the ones a price move fires are
+    found by bisecting, and nothing is allocated per tick except the views
+    of those that fire.
+
+    A tick that prices a large share of the pairs (the polling pipeline
+    prices all of them) is evaluated with NumPy instead, if it is
+    installed: one mask over a flat copy of every pair's arrays, about
+    fifty bytes a tracker more. Pairs changed since the copy was built are
+    bisected until there are enough of them to rebuild it. Ticks of a few
+    pairs (adaptive, stream) always bisect.
+
+    Also keeps the count and the sum of per-row hashes the snapshot
+    resyncs against.
+    """
+
+    # Share of the pairs a tick must price to be evaluated with NumPy.
+    VECTOR_SHARE = 0.25
+    # Share of the pairs changed since the flat copy was built that has it
+    # rebuilt; until then the changed pairs are bisected.
+    REFLATTEN_SHARE = 0.125
+
+    def __init__(self, vectorize: bool = True) -> None:
+        self.pairs: dict[int, PairTrackers] = {}
+        self._pair_of: dict[int, int] = {}
+        self.count = 0
+        self.hash_sum = 0
+        self.vectorize = vectorize and np is not None
+        self._flat: _FlatTrackers | None = None
+        self._changed: set[int] = set()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add_pair(
+        self,
+        pair_id: int,
+        key: PairKey,
+        base: str,
+        quote: str,
+        last_price: float | None,
+        checked_at: float | None,
+    ) -> None:
+        if pair_id not in self.pairs:
+            self.pairs[pair_id] = PairTrackers(pair_id, key, base, quote, last_price, checked_at)
+            if self._flat is not None:
+                self._changed.add(pair_id)
+
+    def add(
+        self,
+        tracker_id: int,
+        user_id: int,
+        pair_id: int,
+        gte: bool,
+        target: float,
+        created: float,
+        row_hash: int,
+    ) -> None:
+        """Adds a tracker to its pair, which must have been added first."""
+        self.pairs[pair_id].add(gte, target, tracker_id, user_id, created, row_hash)
+        self._pair_of[tracker_id] = pair_id
+        self.count += 1
+        self.hash_sum += row_hash
+        if self._flat is not None:
+            self._changed.add(pair_id)
+
+    def remove(self, tracker_ids: set[int]) -> None:
+        by_pair: dict[int, set[int]] = {}
+        for tid in tracker_ids:
+            pid = self._pair_of.pop(tid, None)
+            if pid is not None:
+                by_pair.setdefault(pid, set()).add(tid)
+        if self._flat is not None:
+            self._changed.update(by_pair)
+        for pid, dead in by_pair.items():
+            p = self.pairs[pid]
+            for side in (p.gte, p.lte):
+                removed, hashes = side.remove(dead)
+                self.count -= len(removed)
+                self.hash_sum -= hashes
+            if not len(p):
+                del self.pairs[pid]
+            elif p.fresh and not dead.isdisjoint(f[2] for f in p.fresh):
+                p.fresh = [f for f in p.fresh if f[2] not in dead]
+
+    def set_price(self, pair_id: int, price: float | None, checked_at: datetime | None) -> None:
+        p = self.pairs.get(pair_id)
+        if p is not None:
+            p.checked(price, checked_at.timestamp() if checked_at is not None else None)
+
+    def merge_price(self, pair_id: int, price: float | None, checked_at: float | None) -> None:
+        """Takes the price only if it was checked later than the one held."""
+        p = self.pairs.get(pair_id)
+        if p is not None and checked_at is not None and (p.checked_at is None or checked_at > p.checked_at):
+            p.checked(price, checked_at)
+
+    def merge_prices(self, other: TrackerTable) -> None:
+        """Takes every price `other` checked later than this table did."""
+        for pid, p in other.pairs.items():
+            self.merge_price(pid, p.last_price, p.checked_at)
+
+    def fired(
+        self,
+        pair_prices: Mapping[int, float],
+        now: datetime,
+        pending: Mapping[int, tuple[float, datetime]] | None = None,
+    ) -> tuple[list[tuple[TrackerView, float]], int]:
+        """
+        Trackers the new `pair_prices` fire, and how many trackers were
+        looked at. A pair's previous price comes from `pending` (evaluated,
+        not stored yet) when it has one.
+        """
+        ts = now.timestamp()
+        if self.vectorize and self.pairs and len(pair_prices) >= self.VECTOR_SHARE * len(self.pairs):
+            return self._fired_vector(pair_prices, ts, pending)
+        out: list[tuple[TrackerView, float]] = []
+        evaluated = 0
+        for pid, current in pair_prices.items():
+            p = self.pairs.get(pid)
+            if p is None:
+                continue
+            evaluated += len(p)
+            state = pending.get(pid) if pending else None
+            if state is not None:
+                last, checked_at = state[0], state[1].timestamp()
+            else:
+                last, checked_at = p.last_price, p.checked_at
+            for direction, tid, user_id, target in p.fired(last, checked_at, current, ts):
+                out.append((TrackerView(tid, user_id, pid, p.base, p.quote, direction, target), current))
+        return out, evaluated
+
+    def _fired_vector(
+        self,
+        pair_prices: Mapping[int, float],
+        ts: float,
+        pending: Mapping[int, tuple[float, datetime]] | None,
+    ) -> tuple[list[tuple[TrackerView, float]], int]:
+        """
+        `fired` as one NumPy mask over every tracker. Fresh trackers, and
+        pairs changed since the flat copy was built, are done per pair.
+        """
+        flat, changed = self._flat, self._changed
+        if flat is None or len(changed) > self.REFLATTEN_SHARE * len(self.pairs):
+            flat = self._flat = _FlatTrackers(self.pairs)
+            changed.clear()
+        # Per side (gte of pair i at 2i, lte at 2i+1) the open-closed range
+        # of keys a move crosses; NaN compares false, so unpriced pairs,
+        # changed ones and empty ranges fire nothing.
+        nan = float("nan")
+        lo = [nan] * (2 * len(flat.pairs))
+        hi = lo[:]
+        excluded: set[int] = set()
+        extra: list[tuple[TrackerView, float]] = []
+        evaluated = 0
+        for pid, current in pair_prices.items():
+            p = self.pairs.get(pid)
+            if p is None:
+                continue
+            evaluated += len(p)
+            state = pending.get(pid) if pending else None
+            if state is not None:
+                last, checked_at = state[0], state[1].timestamp()
+            else:
+                last, checked_at = p.last_price, p.checked_at
+            if pid in changed:
+                for direction, tid, user_id, target in p.fired(last, checked_at, current, ts):
+                    extra.append((TrackerView(tid, user_id, pid, p.base, p.quote, direction, target), current))
+                continue
+            if checked_at is None:
+                last = None
+            i = flat.index[pid]
+            # gte: last < target <= current; lte: -last < -target <= -current.
+            if last is None:
+                lo[2 * i] = lo[2 * i + 1] = -math.inf
+            else:
+                lo[2 * i], lo[2 * i + 1] = last, -last
+            hi[2 * i], hi[2 * i + 1] = current, -current
+            if p.fresh:
+                skip, fresh = p.fresh_fired(last, checked_at, current, ts)
+                excluded |= skip
+                for direction, tid, user_id, target in fresh:
+                    extra.append((TrackerView(tid, user_id, pid, p.base, p.quote, direction, target), current))
+
+        hi = np.array(hi)
+        hits = flat.crossed(np.array(lo), hi)
+        sides = flat.side[hits]
+        out: list[tuple[TrackerView, float]] = []
+        pairs, directions = flat.pairs, (Direction.gte, Direction.lte)
+        for tid, user_id, side, key, current in zip(
+            flat.ids[hits].tolist(), flat.users[hits].tolist(), sides.tolist(),
+            flat.keys[hits].tolist(), hi[sides & ~1].tolist(),
+        ):
+            if tid in excluded:
+                continue
+            p = pairs[side >> 1]
+            lte = side & 1
+            target = -key if lte else key
+            out.append((TrackerView(tid, user_id, p.pair_id, p.base, p.quote, directions[lte], target), current))
+        out.extend(extra)
+        return out, evaluated
+
+
+class _FlatTrackers:
+    """
+    Every tracker of a TrackerTable as flat NumPy columns, side by side:
+    the gte trackers of pair i, then its lte ones with targets negated, so
+    one comparison covers both directions.
+    """
+
+    __slots__ = ("pairs", "index", "side", "keys", "ids", "users", "_lo", "_hi", "_above", "_below")
+
+    def __init__(self, pairs: Mapping[int, PairTrackers]) -> None:
+        self.pairs = list(pairs.values())
+        self.index = {pid: i for i, pid in enumerate(pairs)}
+        sides = [s for p in self.pairs for s in (p.gte, p.lte)]
+        lengths = np.fromiter((len(s) for s in sides), dtype=np.int64, count=len(sides))
+        self.side = np.repeat(np.arange(len(sides)), lengths)
+        # Copies: the arrays keep changing, and one exporting its buffer can't.
+        self.keys = np.frombuffer(b"".join(s.targets for s in sides), dtype=np.float64).copy()
+        self.keys[self.side & 1 == 1] *= -1
+        self.ids = np.frombuffer(b"".join(s.ids for s in sides), dtype=np.int64)
+        self.users = np.frombuffer(b"".join(s.users for s in sides), dtype=np.int64)
+        # Reused every tick: fresh temporaries this size cost more in page
+        # faults than the comparisons themselves.
+        self._lo = np.empty(len(self.keys))
+        self._hi = np.empty(len(self.keys))
+        self._above = np.empty(len(self.keys), dtype=bool)
+        self._below = np.empty(len(self.keys), dtype=bool)
+
+    def crossed(self, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+        """Positions of the trackers with lo[side] < key <= hi[side]."""
+        np.take(lo, self.side, out=self._lo)
+        np.take(hi, self.side, out=self._hi)
+        np.less(self._lo, self.keys, out=self._above)
+        np.less_equal(self.keys, self._hi, out=self._below)
+        return np.flatnonzero(np.logical_and(self._above, self._below, out=self._above))
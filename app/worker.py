@@ -0,0 +1,7 @@
+import asyncio
+from app.main import main
+
+# Standalone checker: no polling, only price checks over the partitions
+# this process currently owns. Run as many replicas as needed.
+if __name__ == "__main__":
+    asyncio.run(main("checker"))
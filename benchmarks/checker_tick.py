@@ -0,0 +1,288 @@
+"""
+Checker tick under synthetic load: seeds N trackers into the database in
+DATABASE_URL, serves CoinGecko/Frankfurter/NBU from a local fake upstream
+with injectable latency and drives the production polling path over it:
+a TrackerSnapshot loaded once per size, then one CheckerPipeline tick at a
+time. Reports each tick's wall time per phase (fetch, evaluate, commit)
+plus the time the outbox sender needs to deliver the tick's alerts to a
+stub bot.
+
+    python -m benchmarks.checker_tick --trackers 10000 100000 1000000 --reset
+
+The first tick of every size sees only new trackers; later ticks take the
+steady-state path. Point DATABASE_URL at a throwaway database: --reset
+truncates trackers, price_pairs and alert_outbox.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import math
+import random
+import sys
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+import aiohttp
+from aiohttp import web
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from app.config import settings
+from app.db.init_db import init_db
+from app.db.session import engine
+from app.services.notifier import AlertDispatcher
+from app.services.outbox import OutboxSender
+from app.services.pipeline import CheckerPipeline
+from app.services.prices.cache import create_price_cache
+from app.services.prices.frankfurter import CURRENCIES as FRANKFURTER_CURRENCIES
+from app.services.prices.providers import create_price_router
+from app.services.tracker_snapshot import TrackerSnapshot
+from benchmarks import synthetic
+
+FX_CODES = sorted(FRANKFURTER_CURRENCIES | {"UAH"})
+PHASES = ("fetch", "evaluate", "commit")
+
+
+def _phase_totals() -> dict[str, float]:
+    """Seconds the pipeline has reported per phase so far (price_check_phase_seconds)."""
+    return {
+        p: REGISTRY.get_sample_value("price_check_phase_seconds_sum", {"phase": p}) or 0.0
+        for p in PHASES
+    }
+
+
+class FakeUpstream:
+    """
+    Prices whose log drifts from a fixed reference with stddev
+    `volatility * sqrt(tick)`, served in each provider's wire format after
+    `latency` seconds.
+    """
+
+    def __init__(self, latency: float, volatility: float, seed: int) -> None:
+        self.latency = latency
+        self.volatility = volatility
+        self.seed = seed
+        self.step = 0
+        self.requests = 0
+        rng = random.Random(seed)
+        # Units of each currency per USD.
+        self.usd = {c: (1.0 if c == "USD" else math.exp(rng.uniform(-3, 5))) for c in FX_CODES}
+
+    def coin_usd(self, coin_id: str) -> float:
+        return math.exp((zlib.crc32(coin_id.encode()) % 1600) / 100 - 6)
+
+    def reference(self, kind: str, key: str, quote: str) -> float:
+        """Price at step 0, which trackers' targets are spread around."""
+        if kind == "crypto":
+            return self.coin_usd(key) * self.usd[quote.upper()]
+        return self.usd[quote] / self.usd[key]
+
+    def price(self, kind: str, key: str, quote: str) -> float:
+        move = 0.0
+        if self.step:
+            move = random.Random(f"{self.seed}:{kind}:{key}:{quote}:{self.step}").gauss(0, self.volatility)
+        return self.reference(kind, key, quote) * math.exp(move * math.sqrt(self.step))
+
+    async def _delay(self) -> None:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def simple_price(self, request: web.Request) -> web.Response:
+        await self._delay()
+        ids = request.query.get("ids", "").split(",")
+        vs = request.query.get("vs_currencies", "").split(",")
+        return web.json_response({c: {q: self.price("crypto", c, q) for q in vs} for c in ids if c})
+
+    async def latest(self, request: web.Request) -> web.Response:
+        await self._delay()
+        rates = {q: self.price("fx", "EUR", q) for q in FRANKFURTER_CURRENCIES if q != "EUR"}
+        return web.json_response({"base": "EUR", "rates": rates})
+
+    async def nbu(self, request: web.Request) -> web.Response:
+        await self._delay()
+        day = datetime.now(timezone.utc).strftime("%d.%m.%Y")
+        rows = [
+            {"cc": c, "rate": self.usd["UAH"] / self.usd[c], "exchangedate": day}
+            for c in FX_CODES if c != "UAH"
+        ]
+        return web.json_response(rows)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/api/v3/simple/price", self.simple_price)
+        app.router.add_get("/latest", self.latest)
+        app.router.add_get("/nbu", self.nbu)
+        return app
+
+
+class StubBot:
+    """Stands in for aiogram's Bot: counts messages instead of sending them."""
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.sent = 0
+
+    async def send_message(self, chat_id: int, text: str, parse_mode: str | None = None) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.sent += 1
+
+
+def _pairs(args: argparse.Namespace, rng: random.Random) -> list[tuple[str, str | None, str, str]]:
+    """(kind, coin_id, base, quote) for the whole pair universe."""
+    out: list[tuple[str, str | None, str, str]] = []
+    for i in range(args.coins):
+        coin_id = f"coin-{i:06d}"
+        for q in set(synthetic.quotes(rng, 2)):
+            out.append(("crypto", coin_id, f"C{i}", q.upper()))
+    fx = [(b, q) for b in FX_CODES for q in FX_CODES if b != q]
+    for b, q in rng.sample(fx, min(args.fx_pairs, len(fx))):
+        out.append(("fx", None, b, q))
+    rng.shuffle(out)
+    return out
+
+
+async def _seed(conn, n: int, args: argparse.Namespace, upstream: FakeUpstream) -> int:
+    rng = random.Random(args.seed)
+    pairs = _pairs(args, rng)
+    picks = synthetic.pick(rng, len(pairs), n, args.distribution)
+    counts = [0] * len(pairs)
+    for i in picks:
+        counts[i] += 1
+
+    raw = (await conn.get_raw_connection()).driver_connection
+    await raw.execute("TRUNCATE trackers, price_pairs, alert_outbox RESTART IDENTITY CASCADE")
+    await raw.copy_records_to_table(
+        "price_pairs",
+        columns=["id", "kind", "coin_id", "base", "quote", "active_trackers"],
+        records=[(i + 1, k, c, b, q, counts[i]) for i, (k, c, b, q) in enumerate(pairs) if counts[i]],
+    )
+    await raw.execute("SELECT setval(pg_get_serial_sequence('price_pairs', 'id'), $1)", len(pairs))
+
+    created = datetime.now(timezone.utc) - timedelta(days=1)
+    users = max(1, n // args.trackers_per_user)
+
+    def trackers():
+        for i in picks:
+            kind, coin_id, base, quote = pairs[i]
+            ref = upstream.reference(kind, coin_id or base, quote.lower() if coin_id else quote)
+            target = ref * math.exp(rng.gauss(0, args.spread))
+            direction = "gte" if target > ref else "lte"
+            yield (
+                rng.randrange(users) + 1, kind, coin_id, base, quote, i + 1,
+                direction, Decimal(f"{target:.8f}"), True, created,
+            )
+
+    await raw.copy_records_to_table(
+        "trackers",
+        columns=[
+            "tg_user_id", "kind", "coin_id", "base", "quote", "pair_id",
+            "direction", "target", "is_active", "created_at",
+        ],
+        records=trackers(),
+    )
+    await raw.execute("ANALYZE trackers; ANALYZE price_pairs")
+    return sum(1 for c in counts if c)
+
+
+async def _run(args: argparse.Namespace) -> None:
+    settings.COINGECKO_REQUESTS_PER_MINUTE = args.coingecko_rpm
+    await init_db()
+    async with engine.connect() as conn:
+        existing = (await conn.execute(text("SELECT count(*) FROM trackers"))).scalar_one()
+    if existing and not args.reset:
+        sys.exit(f"trackers already has {existing} rows; rerun with --reset to wipe them")
+
+    upstream = FakeUpstream(args.latency_ms / 1000, args.volatility, args.seed)
+    runner = web.AppRunner(upstream.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    url = f"http://127.0.0.1:{runner.addresses[0][1]}"
+
+    print(
+        f"{'trackers':>9} {'pairs':>6} {'tick':>4} "
+        + " ".join(f"{p:>8}" for p in PHASES)
+        + f" {'total':>8} {'deliver':>8} {'alerts':>7} {'upstream':>8}"
+    )
+    try:
+        for n in args.trackers:
+            async with engine.begin() as conn:
+                t0 = time.perf_counter()
+                pair_count = await _seed(conn, n, args, upstream)
+            print(f"# seeded {n} trackers on {pair_count} pairs in {time.perf_counter() - t0:.1f}s")
+
+            snapshot = TrackerSnapshot(engine, resync_seconds=24 * 3600)
+            t0 = time.perf_counter()
+            await snapshot.start()
+            print(f"# loaded {len(snapshot)} trackers into the snapshot in {time.perf_counter() - t0:.2f}s")
+
+            async with aiohttp.ClientSession() as http:
+                router = create_price_router(http)
+                router.get("coingecko").client.BASE = f"{url}/api/v3"
+                router.get("frankfurter").client.base_url = url
+                # A new vector every tick, so fx prices move like crypto ones.
+                router.get("frankfurter").client.refresh_seconds = 0
+                router.get("nbu").client.URL = f"{url}/nbu"
+                pipeline = CheckerPipeline(router, create_price_cache(), snapshot)
+                pipeline.start()
+                bot = StubBot(args.send_latency_ms / 1000)
+                notifier = AlertDispatcher(
+                    bot, workers=args.notify_workers, rate_per_second=1e9,
+                    per_chat_per_second=1e9, queue_size=10_000_000,
+                )
+                notifier.start()
+                sender = OutboxSender(notifier, engine, batch_size=args.outbox_batch)
+                upstream.step = 0
+                for tick in range(1, args.ticks + 1):
+                    upstream.step = tick
+                    requests_before, sent_before = upstream.requests, bot.sent
+                    phases_before = _phase_totals()
+                    t0 = time.perf_counter()
+                    await pipeline.fetch(None)
+                    await pipeline.drain()
+                    total = time.perf_counter() - t0
+                    phases = _phase_totals()
+                    t0 = time.perf_counter()
+                    while await sender.send_batch():
+                        await notifier.join()
+                        await sender.flush()
+                    deliver = time.perf_counter() - t0
+                    print(
+                        f"{n:>9} {pair_count:>6} {tick:>4} "
+                        + " ".join(f"{(phases[p] - phases_before[p]) * 1000:>8.1f}" for p in PHASES)
+                        + f" {total * 1000:>8.1f} {deliver * 1000:>8.1f}"
+                        f" {bot.sent - sent_before:>7} {upstream.requests - requests_before:>8}"
+                    )
+                await notifier.stop()
+                await pipeline.stop()
+            await snapshot.stop()
+    finally:
+        await runner.cleanup()
+        await engine.dispose()
+    print("# times in ms; alerts = messages delivered (one per user per tick)")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--trackers", type=int, nargs="+", default=[10_000, 100_000])
+    ap.add_argument("--coins", type=int, default=5_000, help="distinct coin ids")
+    ap.add_argument("--fx-pairs", type=int, default=200)
+    ap.add_argument("--distribution", choices=synthetic.DISTRIBUTIONS, default="zipf")
+    ap.add_argument("--trackers-per-user", type=int, default=5)
+    ap.add_argument("--spread", type=float, default=0.05, help="stddev of log(target / price)")
+    ap.add_argument("--volatility", type=float, default=0.01, help="stddev of log price move per tick")
+    ap.add_argument("--ticks", type=int, default=3)
+    ap.add_argument("--latency-ms", type=float, default=50.0, help="fake upstream response latency")
+    ap.add_argument("--send-latency-ms", type=float, default=0.0, help="stub bot send_message latency")
+    ap.add_argument("--notify-workers", type=int, default=settings.NOTIFY_WORKERS)
+    ap.add_argument("--outbox-batch", type=int, default=settings.OUTBOX_BATCH_SIZE)
+    ap.add_argument("--coingecko-rpm", type=float, default=0.0, help="provider rate limit, 0 = none")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--reset", action="store_true", help="wipe existing trackers and price_pairs")
+    asyncio.run(_run(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Request count for CoinGecko /simple/price: one call per quote (previous
+checker behaviour) vs. the batch planner, for a synthetic tracker population.
+
+    python -m benchmarks.coingecko_batching
+"""
+from __future__ import annotations
+import argparse
+import random
+import time
+from collections import defaultdict
+from app.services.prices.batching import plan_simple_price_batches
+from app.services.prices.coingecko import CoinGeckoClient
+from benchmarks import synthetic
+
+# The usual fiat quotes plus crypto ones.
+QUOTES = [*synthetic.CRYPTO_QUOTES, "btc", "eth"]
+QUOTE_WEIGHTS = [*synthetic.CRYPTO_QUOTE_WEIGHTS, 2, 1]
+
+
+def _demand(trackers: int, universe: list[str], rng: random.Random) -> dict[str, set[str]]:
+    coins = synthetic.pick(rng, len(universe), trackers)
+    demand: dict[str, set[str]] = defaultdict(set)
+    for c, q in zip(coins, synthetic.quotes(rng, trackers, QUOTES, QUOTE_WEIGHTS)):
+        demand[universe[c]].add(q)
+    return demand
+
+
+def _plan(demand: dict[str, set[str]], max_ids: int = CoinGeckoClient.MAX_IDS_PER_CALL):
+    return plan_simple_price_batches(
+        demand,
+        base_url_length=len(f"{CoinGeckoClient.BASE}/simple/price"),
+        max_url_length=CoinGeckoClient.MAX_URL_LENGTH,
+        max_ids=max_ids,
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--universe", type=int, default=15_000, help="distinct coin ids")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    universe = synthetic.coin_ids(rng, args.universe)
+
+    print(f"{'trackers':>9} {'coins':>6} {'per-quote':>9} {'too long':>8} {'planned':>7} {'plan ms':>8}")
+    for n in (10, 100, 1_000, 10_000, 100_000, 500_000):
+        demand = _demand(n, universe, rng)
+
+        by_quote: dict[str, list[str]] = defaultdict(list)
+        for c, qs in demand.items():
+            for q in qs:
+                by_quote[q].append(c)
+        # Quotes whose ids don't fit one URL: planned without an id cap,
+        # they still take more than one call.
+        too_long = sum(
+            1 for q, ids in by_quote.items() if len(_plan({c: {q} for c in ids}, max_ids=len(ids))) > 1
+        )
+
+        t0 = time.perf_counter()
+        batches = _plan(demand)
+        ms = (time.perf_counter() - t0) * 1000
+
+        covered = {(c, q) for b in batches for c in b.ids for q in b.vs_currencies}
+        assert all((c, q) in covered for c, qs in demand.items() for q in qs)
+
+        print(f"{n:>9} {len(demand):>6} {len(by_quote):>9} {too_long:>8} {len(batches):>7} {ms:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Time to find the trackers one tick of prices fires, per evaluator:
+
+    loop        one crossing test per tracker (the original checker loop)
+    numpy/pair  per-pair NumPy arrays, one vectorized mask per pair
+    numpy/all   one mask over all trackers, prices gathered by pair index
+    table       TrackerTable, resident sorted arrays bisected per pair
+    table/numpy TrackerTable's NumPy path, one mask over its flattened arrays
+
+    python -m benchmarks.crossing_eval --trackers 10000 100000 1000000
+
+NumPy is only needed for the numpy columns (pip install numpy); they are
+skipped without it. Every evaluator must fire the same trackers. Needs no
+database or settings.
+"""
+from __future__ import annotations
+import argparse
+import gc
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from app.db.models import Direction
+from app.services.tracker_table import TrackerTable
+from benchmarks import synthetic
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+METHODS = ("loop", "numpy/pair", "numpy/all", "table", "table/numpy")
+
+
+def _population(n: int, pairs: int, spread: float, rng: random.Random):
+    pair_of = synthetic.pick(rng, pairs, n)
+    prices = [rng.lognormvariate(3, 2) for _ in range(pairs)]
+    gte = [rng.random() < 0.5 for _ in range(n)]
+    targets = [prices[p] * rng.lognormvariate(0, spread) for p in pair_of]
+    return pair_of, gte, targets, prices
+
+
+def _crossed(direction: Direction, last: float, current: float, target: float) -> bool:
+    if direction == Direction.gte:
+        return last < target <= current
+    return last > target >= current
+
+
+class Loop:
+    def __init__(self, pair_of, gte, targets, last):
+        self.rows = [
+            (p, Direction.gte if g else Direction.lte, t) for p, g, t in zip(pair_of, gte, targets)
+        ]
+        self.last = list(last)
+
+    def tick(self, current: list[float]) -> list[int]:
+        fired = []
+        last = self.last
+        for i, (p, direction, target) in enumerate(self.rows):
+            if _crossed(direction, last[p], current[p], target):
+                fired.append(i)
+        self.last = list(current)
+        return fired
+
+
+class NumpyPerPair:
+    def __init__(self, pair_of, gte, targets, last):
+        order = sorted(range(len(pair_of)), key=pair_of.__getitem__)
+        self.pairs: dict[int, tuple] = {}
+        start = 0
+        while start < len(order):
+            p = pair_of[order[start]]
+            end = start
+            while end < len(order) and pair_of[order[end]] == p:
+                end += 1
+            idx = order[start:end]
+            self.pairs[p] = (
+                np.array([targets[i] for i in idx]),
+                np.array([gte[i] for i in idx]),
+                np.array(idx),
+            )
+            start = end
+        self.last = np.array(last)
+
+    def tick(self, current: list[float]) -> list[int]:
+        fired = []
+        for p, (t, g, ids) in self.pairs.items():
+            last, cur = self.last[p], current[p]
+            mask = np.where(g, (last < t) & (t <= cur), (last > t) & (t >= cur))
+            fired.append(ids[mask])
+        self.last[:] = current
+        return np.concatenate(fired).tolist()
+
+
+class NumpyAll:
+    def __init__(self, pair_of, gte, targets, last):
+        self.pair = np.array(pair_of)
+        self.targets = np.array(targets)
+        self.gte = np.array(gte)
+        self.last = np.array(last)
+
+    def tick(self, current: list[float]) -> list[int]:
+        cur = np.asarray(current)
+        last_t, cur_t = self.last[self.pair], cur[self.pair]
+        t = self.targets
+        mask = np.where(self.gte, (last_t < t) & (t <= cur_t), (last_t > t) & (t >= cur_t))
+        self.last[:] = cur
+        return np.flatnonzero(mask).tolist()
+
+
+class Table:
+    vectorize = False
+
+    def __init__(self, pair_of, gte, targets, last):
+        self.now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        created = (self.now - timedelta(days=1)).timestamp()
+        self.table = TrackerTable(vectorize=self.vectorize)
+        # Like the snapshot: only pairs with active trackers.
+        for p in set(pair_of):
+            price = last[p]
+            self.table.add_pair(p, ("fx", "A", "B"), "A", "B", price, self.now.timestamp())
+        for i in sorted(range(len(pair_of)), key=targets.__getitem__):
+            self.table.add(i, 0, pair_of[i], gte[i], targets[i], created, 0)
+
+    def tick(self, current: list[float]) -> list[int]:
+        prices = dict(enumerate(current))
+        fired, _ = self.table.fired(prices, self.now)
+        for p, price in prices.items():
+            self.table.set_price(p, price, self.now)
+        return [t.id for t, _ in fired]
+
+
+class VectorTable(Table):
+    vectorize = True
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--trackers", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--pairs", type=int, default=5_000)
+    ap.add_argument("--spread", type=float, default=0.05, help="stddev of log(target / price)")
+    ap.add_argument("--volatility", type=float, default=0.01, help="stddev of log price move per tick")
+    ap.add_argument("--ticks", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    classes = {
+        "loop": Loop, "numpy/pair": NumpyPerPair, "numpy/all": NumpyAll,
+        "table": Table, "table/numpy": VectorTable,
+    }
+    methods = [m for m in METHODS if np is not None or "numpy" not in m]
+    if np is None:
+        print("# numpy not installed; skipping the numpy columns")
+    print(f"{'trackers':>9} {'pairs':>6} " + " ".join(f"{m:>11}" for m in methods) + f" {'fired':>8}")
+    for n in args.trackers:
+        rng = random.Random(args.seed)
+        pair_of, gte, targets, prices = _population(n, args.pairs, args.spread, rng)
+        ticks = [prices]
+        for _ in range(args.ticks):
+            ticks.append([p * rng.lognormvariate(0, args.volatility) for p in ticks[-1]])
+
+        spent: dict[str, float] = {}
+        fired: dict[str, list[list[int]]] = {}
+        for m in methods:
+            evaluator = classes[m](pair_of, gte, targets, ticks[0])
+            fired[m] = []
+            # Keep the cyclic GC from rescanning the inputs' million-item lists
+            # on every collection the evaluator's allocations set off.
+            gc.collect()
+            gc.freeze()
+            start = time.perf_counter()
+            for current in ticks[1:]:
+                fired[m].append(evaluator.tick(current))
+            spent[m] = (time.perf_counter() - start) / args.ticks
+            gc.unfreeze()
+            del evaluator
+        reference = [sorted(ids) for ids in fired[methods[0]]]
+        for m in methods[1:]:
+            if [sorted(ids) for ids in fired[m]] != reference:
+                raise SystemExit(f"{m} and {methods[0]} fired different trackers")
+        print(
+            f"{n:>9} {len(set(pair_of)):>6} "
+            + " ".join(f"{spent[m] * 1000:>11.2f}" for m in methods)
+            + f" {sum(map(len, reference)) / args.ticks:>8.0f}"
+        )
+    print("# ms per tick; fired = trackers fired per tick")
+
+
+if __name__ == "__main__":
+    main()
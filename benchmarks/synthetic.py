@@ -0,0 +1,40 @@
+"""
+Synthetic tracker populations shared by the benchmarks: which pairs exist
+and how trackers spread over them.
+"""
+from __future__ import annotations
+import random
+import string
+from typing import Sequence
+
+# Quotes of crypto pairs, most popular first.
+CRYPTO_QUOTES = ("usd", "eur", "uah", "gbp", "pln", "jpy")
+CRYPTO_QUOTE_WEIGHTS = (50, 20, 15, 5, 5, 5)
+
+DISTRIBUTIONS = ("zipf", "uniform")
+
+
+def popularity(n: int, distribution: str = "zipf") -> list[float]:
+    """Weights of `n` items: zipf (a few carry most of the trackers) or uniform."""
+    if distribution == "uniform":
+        return [1.0] * n
+    return [1.0 / (i + 1) for i in range(n)]
+
+
+def pick(rng: random.Random, n: int, k: int, distribution: str = "zipf") -> list[int]:
+    """Indexes into `n` items for `k` trackers, drawn by popularity."""
+    return rng.choices(range(n), weights=popularity(n, distribution), k=k)
+
+
+def coin_ids(rng: random.Random, n: int) -> list[str]:
+    """`n` coin ids of realistic, varying length (it matters for URL budgets)."""
+    return ["".join(rng.choices(string.ascii_lowercase + "-", k=rng.randint(4, 18))) for _ in range(n)]
+
+
+def quotes(
+    rng: random.Random,
+    k: int,
+    choices: Sequence[str] = CRYPTO_QUOTES,
+    weights: Sequence[float] = CRYPTO_QUOTE_WEIGHTS,
+) -> list[str]:
+    return rng.choices(choices, weights=weights, k=k)
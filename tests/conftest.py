@@ -0,0 +1,5 @@
+import os
+
+# app.config requires these; nothing in the tests talks to Telegram or a database.
+os.environ.setdefault("BOT_TOKEN", "1:test")
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://test@localhost/test")
@@ -0,0 +1,39 @@
+import math
+from app.services.prices.batching import plan_simple_price_batches
+
+BASE = len("https://api.coingecko.com/api/v3/simple/price")
+
+
+def _demand(n: int, id_len: int, quotes=("usd",)) -> dict[str, list[str]]:
+    return {f"c{i:0{id_len - 1}d}": list(quotes) for i in range(n)}
+
+
+def test_id_cap_alone_sets_call_count():
+    for n, id_len in ((1000, 12), (2000, 8), (251, 5), (250, 5), (1, 5)):
+        batches = plan_simple_price_batches(_demand(n, id_len), BASE, max_url_length=10**6)
+        assert len(batches) == math.ceil(n / 250)
+        assert sum(len(b.ids) for b in batches) == n
+
+
+def test_default_url_limit_leaves_no_small_remainders():
+    # 12-char ids: 250 of them fit in 4096 bytes, so the cap decides.
+    batches = plan_simple_price_batches(_demand(1000, 12), BASE)
+    assert [len(b.ids) for b in batches] == [250, 250, 250, 250]
+
+
+def test_url_limit_applies_with_id_cap():
+    batches = plan_simple_price_batches(_demand(1000, 40), BASE, max_url_length=2000)
+    for b in batches:
+        query = "?ids=" + "%2C".join(b.ids) + "&vs_currencies=" + "%2C".join(b.vs_currencies)
+        assert BASE + len(query) <= 2000
+        assert len(b.ids) <= 250
+    assert sorted(c for b in batches for c in b.ids) == sorted(_demand(1000, 40))
+
+
+def test_quotes_merged_and_grouped():
+    demand = {"bitcoin": ["USD", "eur"], "ethereum": ["usd"], "x": [], "": ["usd"]}
+    batches = plan_simple_price_batches(demand, BASE)
+    assert len(batches) == 1
+    assert batches[0].ids == ("bitcoin", "ethereum")
+    assert batches[0].vs_currencies == ("eur", "usd")
+    assert plan_simple_price_batches({}, BASE) == []
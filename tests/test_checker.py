@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+from app.db.models import Direction
+from app.services.checker import TELEGRAM_MESSAGE_LIMIT, _render_alerts, alert_messages
+
+
+def _tracker(id: int, user: int = 1) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=id, tg_user_id=user, base="BTC", quote="USD", direction=Direction.gte, target=50000.0
+    )
+
+
+def test_single_alert():
+    [text] = _render_alerts([(_tracker(1), 50001.5)])
+    assert "BTC/USD ≥ 50000.0" in text
+    assert "50001.50000000" in text
+
+
+def test_many_alerts_split_at_telegram_limit():
+    alerts = [(_tracker(i), 50001.0) for i in range(500)]
+    messages = _render_alerts(alerts)
+    assert len(messages) > 1
+    assert all(len(m) <= TELEGRAM_MESSAGE_LIMIT for m in messages)
+    # Every alert appears exactly once, in order.
+    ids = [int(line.split()[0][1:]) for m in messages for line in m.splitlines() if line.startswith("#")]
+    assert ids == list(range(500))
+
+
+def test_alert_messages_group_per_user():
+    fired = [(_tracker(1, 7), 1.0), (_tracker(2, 8), 1.0), (_tracker(3, 7), 1.0)]
+    messages = alert_messages(fired)
+    assert sorted(chat for chat, _ in messages) == [7, 8]
+    text = dict(messages)[7]
+    assert "Price alerts (2)" in text and "#1 " in text and "#3 " in text
@@ -0,0 +1,45 @@
+from app.services.prices.coin_index import CoinIndex
+from app.services.prices.conversion import QuotePolicy
+from app.services.prices.fx import cross_rate
+from app.services.prices.types import CoinSearchResult
+
+
+def test_quote_policy_derives_non_native_quotes():
+    policy = QuotePolicy(anchor="usd", native=frozenset({"btc"}))
+    assert not policy.derived("USD")
+    assert not policy.derived("btc")
+    assert policy.derived("uah")
+    assert not QuotePolicy(anchor="").derived("uah")
+
+    pairs = {("crypto", "ethereum", "uah"), ("crypto", "ethereum", "btc"), ("crypto", "solana", "usd")}
+    fetch, derived = policy.split(pairs)
+    assert fetch == {("crypto", "ethereum", "usd"), ("crypto", "ethereum", "btc"), ("crypto", "solana", "usd")}
+    assert derived == {("crypto", "ethereum", "uah"): (("crypto", "ethereum", "usd"), ("fx", "USD", "UAH"))}
+
+
+def test_cross_rate():
+    # Price of one unit in EUR.
+    table = {"EUR": 1.0, "USD": 0.9, "UAH": 0.02}
+    assert cross_rate(table, "usd", "uah") == 0.9 / 0.02
+    assert cross_rate(table, "EUR", "EUR") == 1.0
+    assert cross_rate(table, "USD", "GBP") is None
+    assert cross_rate({"USD": 0.0, "EUR": 1.0}, "USD", "EUR") is None
+
+
+def test_coin_index_search():
+    coins = [
+        CoinSearchResult("bitcoin", "Bitcoin", "btc", 1),
+        CoinSearchResult("bitcoin-cash", "Bitcoin Cash", "bch", 20),
+        CoinSearchResult("wrapped-bitcoin", "Wrapped Bitcoin", "wbtc", 15),
+        CoinSearchResult("ethereum", "Ethereum", "eth", 2),
+        CoinSearchResult("obscure-token", "Obscure Token", "obs", None),
+    ]
+    index = CoinIndex(coins)
+    assert [c.id for c in index.search("BTC")] == ["bitcoin"]
+    assert index.search("wrapped bitcoin")[0].id == "wrapped-bitcoin"
+    # Prefix matches come in popularity order.
+    assert [c.id for c in index.search("bitc")] == ["bitcoin", "wrapped-bitcoin", "bitcoin-cash"]
+    assert [c.id for c in index.search("bitcoin", limit=1)] == ["bitcoin"]
+    assert [c.id for c in index.search("etherium")] == ["ethereum"]
+    assert index.search("  ") == []
+    assert index.search("zzzz") == []
@@ -0,0 +1,48 @@
+import asyncio
+import aiohttp
+from aiohttp import web
+from app.services.prices.fake_feed import FakeFeed
+from app.services.prices.streaming import FallbackPriceSource, PollingPriceSource, WebSocketPriceSource
+
+STREAMED = ("crypto", "bitcoin", "usd")
+NOT_STREAMED = ("fx", "USD", "UAH")
+
+
+async def _fallback_polls_only_stale_pairs() -> tuple[list[set], list]:
+    # A long interval: the feed sends only what the test pushes.
+    feed = FakeFeed(interval=3600)
+    runner = web.AppRunner(feed.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    url = f"ws://127.0.0.1:{runner.addresses[0][1]}/ws"
+
+    polled: list[set] = []
+
+    async def fetch(pairs):
+        polled.append(set(pairs))
+        return {p: 40.0 for p in pairs}
+
+    ticks = []
+    async with aiohttp.ClientSession() as http:
+        source = FallbackPriceSource(
+            WebSocketPriceSource(http, url), PollingPriceSource(fetch, interval=0.05), stale_after=0.3
+        )
+        source.subscribe({STREAMED, NOT_STREAMED})
+        task = asyncio.create_task(source.run(ticks.append))
+        try:
+            for i in range(25):
+                await feed.push(STREAMED, 100.0 + i)
+                await asyncio.sleep(0.1)
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    await runner.cleanup()
+    return polled, ticks
+
+
+def test_fallback_polls_only_stale_pairs():
+    polled, ticks = asyncio.run(_fallback_polls_only_stale_pairs())
+    assert polled and all(p == {NOT_STREAMED} for p in polled)
+    assert {t.pair for t in ticks} == {STREAMED, NOT_STREAMED}
+    assert any(t.pair == STREAMED and t.price >= 110.0 for t in ticks)
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.db.models import Direction
+from app.services.tracker_table import TrackerTable, np
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+EARLIER = (NOW - timedelta(hours=1)).timestamp()
+
+
+def _table(vectorize: bool) -> TrackerTable:
+    table = TrackerTable(vectorize=vectorize)
+    table.VECTOR_SHARE = 0.0
+    table.add_pair(1, ("crypto", "bitcoin", "usd"), "BTC", "USD", 100.0, EARLIER)
+    table.add_pair(2, ("fx", "EUR", "UAH"), "EUR", "UAH", None, None)
+    created = EARLIER - 60
+    table.add(10, 500, 1, True, 105.0, created, 1)
+    table.add(11, 500, 1, True, 120.0, created, 2)
+    table.add(12, 501, 1, False, 95.0, created, 3)
+    table.add(13, 501, 1, False, 98.0, created, 4)
+    table.add(20, 502, 2, True, 40.0, created, 5)
+    table.add(21, 502, 2, False, 50.0, created, 6)
+    return table
+
+
+def _ids(table: TrackerTable, prices, now=NOW, pending=None) -> list[int]:
+    fired, _ = table.fired(prices, now, pending)
+    return sorted(t.id for t, _ in fired)
+
+
+PATHS = [False, pytest.param(True, marks=pytest.mark.skipif(np is None, reason="numpy not installed"))]
+
+
+@pytest.mark.parametrize("vectorize", PATHS)
+def test_fires_only_crossings(vectorize):
+    table = _table(vectorize)
+    assert _ids(table, {1: 104.0}) == []
+    assert _ids(table, {1: 105.0}) == [10]
+    assert _ids(table, {1: 98.0}) == [13]
+    assert _ids(table, {1: 95.0}) == [12, 13]
+    # A target at the previous price was already reached: no crossing.
+    table.add(16, 501, 1, False, 100.0, EARLIER - 60, 9)
+    assert _ids(table, {1: 99.0}) == []
+
+
+@pytest.mark.parametrize("vectorize", PATHS)
+def test_no_previous_price_fires_every_satisfied_target(vectorize):
+    table = _table(vectorize)
+    assert _ids(table, {2: 45.0}) == [20, 21]
+    fired, evaluated = table.fired({2: 45.0, 3: 1.0}, NOW)
+    assert evaluated == 2
+    view, price = next((t, p) for t, p in fired if t.id == 20)
+    assert (view.pair_id, view.base, view.quote, view.direction, view.target, price) == (
+        2, "EUR", "UAH", Direction.gte, 40.0, 45.0
+    )
+
+
+@pytest.mark.parametrize("vectorize", PATHS)
+def test_fresh_trackers(vectorize):
+    table = _table(vectorize)
+    # Created after the last check: fires if already satisfied.
+    table.add(14, 503, 1, True, 90.0, EARLIER + 10, 7)
+    # Created after `now`: waits for the next check.
+    table.add(15, 503, 1, True, 90.0, NOW.timestamp() + 10, 8)
+    assert _ids(table, {1: 101.0}) == [14]
+
+
+@pytest.mark.parametrize("vectorize", PATHS)
+def test_pending_price_is_the_previous_one(vectorize):
+    table = _table(vectorize)
+    pending = {1: (110.0, NOW - timedelta(seconds=1))}
+    assert _ids(table, {1: 121.0}, pending=pending) == [11]
+
+
+@pytest.mark.parametrize("vectorize", PATHS)
+def test_removed_trackers_never_fire(vectorize):
+    table = _table(vectorize)
+    assert _ids(table, {1: 95.0}) == [12, 13]
+    table.remove({12, 20, 21})
+    assert 2 not in table.pairs
+    assert (table.count, table.hash_sum) == (3, 1 + 2 + 4)
+    assert _ids(table, {1: 95.0, 2: 45.0}) == [13]